@@ -1,21 +1,39 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_from_directory
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, abort, Response, stream_with_context
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from flask_sqlalchemy import SQLAlchemy
 from config import Config
-from models import db, User, Photo, Vote, Comment, Notification
+from models import db, User, Photo, Vote, Comment, Notification, Round, IdempotencyKey, upgrade_schema
 from forms import RegistrationForm, LoginForm, PhotoUploadForm, CommentForm, ProfileUpdateForm
-from utils import save_photo, create_notification, allowed_file
+from utils import save_photo, create_notification, notify_later, allowed_file, get_voted_photo_ids, forget_voted_photo_ids
+from utils import get_comment_page, get_comment_previews, comment_to_dict, photo_img_attrs
+from storage import get_storage
+from commands import register_commands
 from auth import admin_required, voter_required, participant_required, load_user
 from datetime import datetime
 from flask_wtf.csrf import CSRFProtect, generate_csrf
+from jinja2 import FileSystemBytecodeCache
+from profiling import init_template_profiling, template_profile
+from passwords import HashingBusy, needs_rehash
+from rounds import get_open_round, close_round, get_past_winners
+from exports import EXPORT_TABLES, FORMATS, export_lines
+from idempotency import idempotent, new_idempotency_key, request_key, is_expired, stored_reply, stored_response
 import os
 from werkzeug.utils import secure_filename
+from werkzeug.security import generate_password_hash
+from werkzeug.exceptions import HTTPException
+from sqlalchemy import select, update, insert
+from sqlalchemy.exc import IntegrityError
 import uuid
 
 app = Flask(__name__)
 app.config.from_object(Config)
 csrf = CSRFProtect(app)
 
+# Keep compiled templates on disk so restarted workers don't recompile them
+os.makedirs(app.config['TEMPLATE_CACHE_DIR'], exist_ok=True)
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config['TEMPLATE_CACHE_DIR'])
+init_template_profiling(app)
+
 # Initialize extensions
 db.init_app(app)
 login_manager = LoginManager(app)
@@ -26,6 +44,14 @@ login_manager.login_message_category = 'info'
 def user_loader(user_id):
     return load_user(user_id)
 
+register_commands(app)
+
+@app.context_processor
+def inject_vote_helpers():
+    # Templates call voted_photo_ids() so the set is only loaded if a page uses it
+    return {'voted_photo_ids': get_voted_photo_ids, 'photo_img_attrs': photo_img_attrs,
+            'new_idempotency_key': new_idempotency_key}
+
 # Ensure all required directories exist
 basedir = os.path.abspath(os.path.dirname(__file__))
 with app.app_context():
@@ -45,14 +71,17 @@ with app.app_context():
 # Create database tables and default admin
 with app.app_context():
     db.create_all()
-    # Create default admin user if not exists
+    upgrade_schema()
+    get_open_round()
+    # Create default admin user if not exists. Hashed right here: this also
+    # runs in gunicorn's master, which must never start the hashing pool
     if not User.query.filter_by(email='admin@snapshowdown.com').first():
         admin = User(
             email='admin@snapshowdown.com',
             username='Admin',
             role='admin'
         )
-        admin.set_password('admin123')
+        admin.password_hash = generate_password_hash('admin123', method=app.config['PASSWORD_HASH_METHOD'])
         db.session.add(admin)
         
         # Create default participant and voter for testing
@@ -61,7 +90,7 @@ with app.app_context():
             username='Participant',
             role='participant'
         )
-        participant.set_password('password123')
+        participant.password_hash = generate_password_hash('password123', method=app.config['PASSWORD_HASH_METHOD'])
         db.session.add(participant)
         
         voter = User(
@@ -69,7 +98,7 @@ with app.app_context():
             username='Voter',
             role='voter'
         )
-        voter.set_password('password123')
+        voter.password_hash = generate_password_hash('password123', method=app.config['PASSWORD_HASH_METHOD'])
         db.session.add(voter)
         
         db.session.commit()
@@ -82,7 +111,7 @@ with app.app_context():
 
 @app.route('/')
 def home():
-    approved_photos = Photo.query.filter_by(status='approved').order_by(Photo.votes_count.desc()).limit(8).all()
+    approved_photos = Photo.query.filter_by(status='approved', round_id=get_open_round().id).order_by(Photo.votes_count.desc()).limit(8).all()
     return render_template('home.html', photos=approved_photos)
 
 @app.route('/about')
@@ -95,7 +124,7 @@ def contact():
 
 @app.route('/leaderboard')
 def leaderboard():
-    top_photos = Photo.query.filter_by(status='approved')\
+    top_photos = Photo.query.filter_by(status='approved', round_id=get_open_round().id)\
                            .order_by(Photo.votes_count.desc())\
                            .limit(20)\
                            .all()
@@ -105,20 +134,19 @@ def leaderboard():
 
 @app.route('/previous-winners')
 def previous_winners():
-    winners = Photo.query.filter_by(status='approved')\
-                        .order_by(Photo.votes_count.desc())\
-                        .limit(3)\
-                        .all()
+    # Served from the archived results of closed rounds
+    winners = get_past_winners()
     return render_template('previous_winners.html', winners=winners)
 
 @app.route('/gallery')
 def gallery():
     page = request.args.get('page', 1, type=int)
     per_page = 12
-    photos = Photo.query.filter_by(status='approved')\
+    photos = Photo.query.filter_by(status='approved', round_id=get_open_round().id)\
                        .order_by(Photo.votes_count.desc())\
                        .paginate(page=page, per_page=per_page, error_out=False)
-    return render_template('gallery.html', photos=photos)
+    comment_previews = get_comment_previews([photo.id for photo in photos.items])
+    return render_template('gallery.html', photos=photos, comment_previews=comment_previews)
 
 @app.route('/photo/<int:photo_id>')
 def photo_detail(photo_id):
@@ -134,7 +162,9 @@ def photo_detail(photo_id):
             flash('This photo is not available for viewing.', 'error')
             return redirect(url_for('gallery'))
     
-    return render_template('photo_detail.html', photo=photo)
+    comments, next_cursor = get_comment_page(photo.id, limit=app.config['COMMENTS_PER_PAGE'])
+    return render_template('photo_detail.html', photo=photo,
+                           comments=comments, next_cursor=next_cursor)
 
 # ============ AUTHENTICATION ROUTES ============
 
@@ -146,7 +176,22 @@ def login():
     form = LoginForm()
     if form.validate_on_submit():
         user = User.query.filter_by(email=form.email.data).first()
-        if user and user.check_password(form.password.data):
+        try:
+            valid = user is not None and user.check_password(form.password.data)
+        except HashingBusy:
+            flash('The server is busy right now. Please try logging in again in a moment.', 'danger')
+            return render_template('login.html', form=form), 503
+        
+        # Upgrade hashes made with older settings while we have the password;
+        # when hashing is busy, skip it and upgrade on a later login
+        if valid and needs_rehash(user.password_hash):
+            try:
+                user.set_password(form.password.data)
+                db.session.commit()
+            except HashingBusy:
+                pass
+        
+        if valid:
             login_user(user, remember=True)
             flash(f'Welcome back, {user.username}!', 'success')
             next_page = request.args.get('next')
@@ -173,7 +218,11 @@ def register():
             email=form.email.data,
             role=role
         )
-        user.set_password(form.password.data)
+        try:
+            user.set_password(form.password.data)
+        except HashingBusy:
+            flash('The server is busy right now. Please try registering again in a moment.', 'danger')
+            return render_template('register.html', form=form), 503
         db.session.add(user)
         db.session.commit()
         
@@ -227,12 +276,8 @@ def upload_profile_picture():
         # Generate unique filename
         new_filename = f"profile_{current_user.id}_{uuid.uuid4().hex[:8]}.{ext}"
         
-        # Ensure profile pictures directory exists
-        profile_pic_dir = os.path.join(app.config['UPLOAD_FOLDER'], 'profile_pictures')
-        os.makedirs(profile_pic_dir, exist_ok=True)
-        
-        filepath = os.path.join(profile_pic_dir, new_filename)
-        file.save(filepath)
+        # Stream the upload straight to storage
+        get_storage().save(file.stream, f"profile_pictures/{new_filename}")
         
         # Update user profile
         current_user.profile_picture = new_filename
@@ -245,6 +290,7 @@ def upload_profile_picture():
 @app.route('/upload', methods=['GET', 'POST'])
 @login_required
 @participant_required
+@idempotent('profile')
 def upload_photo():
     form = PhotoUploadForm()
     
@@ -256,7 +302,7 @@ def upload_photo():
                 return render_template('upload.html', form=form)
             
             # Save the photo
-            filename = save_photo(form.photo.data)
+            filename, metadata = save_photo(form.photo.data)
             if not filename:
                 flash('Invalid file type. Please upload JPG, PNG, or GIF.', 'error')
                 return render_template('upload.html', form=form)
@@ -267,7 +313,9 @@ def upload_photo():
                 description=form.description.data,
                 filename=filename,
                 user_id=current_user.id,
-                status='pending'
+                round_id=get_open_round().id,
+                status='pending',
+                **(metadata or {})
             )
             
             db.session.add(photo)
@@ -282,7 +330,7 @@ def upload_photo():
         except Exception as e:
             db.session.rollback()
             print(f"Error uploading photo: {e}")
-            flash(f'Error uploading photo: {str(e)}', 'error')
+            flash('Something went wrong while uploading your photo. Please try again.', 'error')
             return render_template('upload.html', form=form)
     
     # For debugging: check form errors
@@ -297,115 +345,197 @@ def upload_photo():
 @app.route('/vote')
 @login_required
 def vote_page():
-    approved_photos = Photo.query.filter_by(status='approved').all()
+    approved_photos = Photo.query.filter_by(status='approved', round_id=get_open_round().id).all()
     return render_template('vote.html', photos=approved_photos)
 
 @app.route('/vote/<int:photo_id>', methods=['POST'])
 @login_required
 def vote(photo_id):
     try:
-        # Debug logging
         print(f"\n=== VOTE ATTEMPT ===")
-        print(f"User ID: {current_user.id}")
-        print(f"Username: {current_user.username}")
-        print(f"User Role: {current_user.role}")
-        print(f"Photo ID: {photo_id}")
-        
-        # Check if user is authenticated
-        if not current_user.is_authenticated:
-            print("User not authenticated")
-            return jsonify({'success': False, 'error': 'Please login to vote.'}), 401
+        print(f"User ID: {current_user.id}, Photo ID: {photo_id}")
         
         # Check if user can vote
         if not current_user.is_voter():
-            print(f"User cannot vote. Role: {current_user.role}, is_voter(): {current_user.is_voter()}")
+            print(f"User cannot vote. Role: {current_user.role}")
             return jsonify({'success': False, 'error': 'You do not have permission to vote.'}), 403
         
+        user_id = current_user.id
+        key = request_key()
+        # A retry of a vote that already went through gets the original response
+        stored = db.session.get(IdempotencyKey, (user_id, key)) if key else None
+        if stored is not None and not is_expired(stored):
+            return stored_reply(stored)
+        
         photo = Photo.query.get_or_404(photo_id)
-        print(f"Photo found: {photo.title}, Status: {photo.status}, Owner: {photo.user_id}")
+        photo_owner_id, photo_title = photo.user_id, photo.title
         
         # Check if photo is approved
         if photo.status != 'approved':
-            print(f"Photo not approved. Status: {photo.status}")
             return jsonify({'success': False, 'error': 'You can only vote for approved photos.'}), 400
         
-        # Check if user already voted
-        existing_vote = Vote.query.filter_by(user_id=current_user.id, photo_id=photo_id).first()
-        if existing_vote:
-            print(f"User already voted at: {existing_vote.voted_at}")
-            return jsonify({'success': False, 'error': 'You have already voted for this photo.'}), 400
+        # Only the open round takes votes
+        round_status = db.session.scalar(select(Round.status).where(Round.id == photo.round_id))
+        if round_status != 'open':
+            return jsonify({'success': False, 'error': 'Voting for this round has closed.'}), 400
         
         # Check if user is trying to vote for their own photo
-        if photo.user_id == current_user.id:
-            print(f"User trying to vote for own photo")
+        if photo_owner_id == user_id:
             return jsonify({'success': False, 'error': 'You cannot vote for your own photo.'}), 400
         
-        # Create vote
-        vote = Vote(user_id=current_user.id, photo_id=photo_id)
-        photo.votes_count += 1
-        
-        db.session.add(vote)
-        db.session.commit()
+        # Vote row, counter and idempotency key go in one transaction;
+        # the unique constraint is the duplicate check
+        try:
+            db.session.add(Vote(user_id=user_id, photo_id=photo_id))
+            votes = db.session.scalar(
+                update(Photo)
+                .where(Photo.id == photo_id)
+                .values(votes_count=Photo.votes_count + 1)
+                .returning(Photo.votes_count)
+            )
+            response = jsonify({
+                'success': True,
+                'message': 'Vote counted successfully!',
+                'votes': votes
+            })
+            if key:
+                db.session.add(stored_response(user_id, key, response, stored))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            # A concurrent retry with the same key may have recorded the vote
+            stored = db.session.get(IdempotencyKey, (user_id, key), populate_existing=True) if key else None
+            if stored is not None and not is_expired(stored):
+                return stored_reply(stored)
+            return jsonify({'success': False, 'error': 'You have already voted for this photo.'}), 400
         
-        print(f"Vote successful! New vote count: {photo.votes_count}")
+        forget_voted_photo_ids()
+        print(f"Vote successful! New vote count: {votes}")
         
-        # Create notification
-        try:
-            create_notification(photo.user_id, f'Your photo "{photo.title}" received a new vote!')
-        except Exception as e:
-            print(f"Failed to create notification: {e}")
+        notify_later(photo_owner_id, f'Your photo "{photo_title}" received a new vote!')
         
-        return jsonify({
-            'success': True,
-            'message': 'Vote counted successfully!',
-            'votes': photo.votes_count
-        })
+        return response
         
+    except HTTPException:
+        raise
     except Exception as e:
         db.session.rollback()
         print(f"Vote error: {str(e)}")
         import traceback
         traceback.print_exc()
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return jsonify({'success': False, 'error': 'Your vote could not be recorded. Please try again.'}), 500
+
+@app.route('/api/votes/batch', methods=['POST'])
+@login_required
+def vote_batch():
+    if not current_user.is_voter():
+        return jsonify({'success': False, 'error': 'You do not have permission to vote.'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    photo_ids = data.get('photo_ids')
+    if not isinstance(photo_ids, list) or not all(type(i) is int for i in photo_ids):
+        return jsonify({'success': False, 'error': 'photo_ids must be a list of photo IDs.'}), 400
+    photo_ids = list(dict.fromkeys(photo_ids))
+    if len(photo_ids) > app.config['MAX_BATCH_VOTES']:
+        return jsonify({'success': False, 'error': f"You can vote for at most {app.config['MAX_BATCH_VOTES']} photos at once."}), 400
+    
+    user_id = current_user.id
+    results = {}
+    # Eligibility for the whole ballot in two queries
+    photos = {p.id: p for p in db.session.execute(
+        select(Photo.id, Photo.status, Photo.user_id, Photo.title, Round.status.label('round_status'))
+        .outerjoin(Round, Photo.round_id == Round.id)
+        .where(Photo.id.in_(photo_ids))
+    ).all()}
+    already_voted = set(db.session.scalars(
+        select(Vote.photo_id)
+        .where(Vote.user_id == user_id, Vote.photo_id.in_(photo_ids))
+    ).all())
+    
+    for photo_id in photo_ids:
+        photo = photos.get(photo_id)
+        if photo is None:
+            results[photo_id] = 'Photo not found.'
+        elif photo.status != 'approved':
+            results[photo_id] = 'You can only vote for approved photos.'
+        elif photo.round_status != 'open':
+            results[photo_id] = 'Voting for this round has closed.'
+        elif photo.user_id == user_id:
+            results[photo_id] = 'You cannot vote for your own photo.'
+        elif photo_id in already_voted:
+            results[photo_id] = 'You have already voted for this photo.'
+    eligible = [photo_id for photo_id in photo_ids if photo_id not in results]
+    
+    # All votes and counter updates in one transaction
+    votes = {}
+    if eligible:
+        try:
+            db.session.execute(insert(Vote), [
+                {'user_id': user_id, 'photo_id': photo_id} for photo_id in eligible
+            ])
+            votes = dict(db.session.execute(
+                update(Photo)
+                .where(Photo.id.in_(eligible))
+                .values(votes_count=Photo.votes_count + 1)
+                .returning(Photo.id, Photo.votes_count)
+            ).all())
+            db.session.commit()
+        except IntegrityError:
+            # Another request voted for one of these photos in the meantime
+            db.session.rollback()
+            return jsonify({'success': False, 'error': 'Some of these votes were already counted. Please refresh and try again.'}), 409
+    
+    if eligible:
+        forget_voted_photo_ids()
+    for photo_id in eligible:
+        notify_later(photos[photo_id].user_id, f'Your photo "{photos[photo_id].title}" received a new vote!')
+    
+    return jsonify({
+        'success': True,
+        'counted': len(eligible),
+        'results': [
+            {'photo_id': photo_id, 'success': True, 'votes': votes[photo_id]}
+            if photo_id in votes else
+            {'photo_id': photo_id, 'success': False, 'error': results[photo_id]}
+            for photo_id in photo_ids
+        ]
+    })
 
 @app.route('/comment/<int:photo_id>', methods=['POST'])
 @login_required
 def add_comment(photo_id):
     try:
         print(f"\n=== COMMENT ATTEMPT ===")
-        print(f"User ID: {current_user.id}")
-        print(f"Username: {current_user.username}")
+        print(f"User ID: {current_user.id}, Photo ID: {photo_id}")
         
-        photo = Photo.query.get_or_404(photo_id)
         content = request.form.get('content')
-        
-        print(f"Photo: {photo.title}, Status: {photo.status}")
-        print(f"Comment content length: {len(content) if content else 0}")
-        
         if not content or not content.strip():
             return jsonify({'success': False, 'error': 'Comment cannot be empty.'}), 400
         
+        photo = Photo.query.get_or_404(photo_id)
+        photo_owner_id, photo_title = photo.user_id, photo.title
+        
         # Check if photo is approved (or user is admin/owner)
         if photo.status != 'approved':
-            if not (current_user.is_admin() or current_user.id == photo.user_id):
+            if not (current_user.is_admin() or current_user.id == photo_owner_id):
                 return jsonify({'success': False, 'error': 'You cannot comment on this photo.'}), 403
         
-        comment = Comment(
+        # Comment and counter in one transaction
+        db.session.add(Comment(
             content=content.strip(),
             user_id=current_user.id,
             photo_id=photo_id
+        ))
+        db.session.execute(
+            update(Photo)
+            .where(Photo.id == photo_id)
+            .values(comments_count=Photo.comments_count + 1)
         )
-        
-        db.session.add(comment)
         db.session.commit()
         
         print(f"Comment added successfully")
         
-        # Create notification
-        try:
-            create_notification(photo.user_id, f'Your photo "{photo.title}" has a new comment.')
-        except Exception as e:
-            print(f"Failed to create notification: {e}")
+        notify_later(photo_owner_id, f'Your photo "{photo_title}" has a new comment.')
         
         return jsonify({
             'success': True, 
@@ -413,6 +543,8 @@ def add_comment(photo_id):
             'username': current_user.username,
             'content': content.strip()
         })
+    except HTTPException:
+        raise
     except Exception as e:
         db.session.rollback()
         print(f"Comment error: {str(e)}")
@@ -433,6 +565,7 @@ def admin_dashboard():
     all_users = User.query.all()
     
     return render_template('admin.html', 
+                         current_round=get_open_round(),
                          pending_photos=pending_photos,
                          approved_photos=approved_photos,
                          rejected_photos=rejected_photos,
@@ -477,6 +610,26 @@ def revert_photo(photo_id):
     flash('Photo reverted to pending.', 'info')
     return redirect(url_for('admin_dashboard'))
 
+@app.route('/admin/close-round', methods=['POST'])
+@login_required
+@admin_required
+def close_current_round():
+    closed = close_round(request.form.get('next_name') or None)
+    flash(f'{closed.name} closed and its results archived.', 'success')
+    return redirect(url_for('admin_dashboard'))
+
+@app.route('/admin/export/<table>.<fmt>')
+@login_required
+@admin_required
+def export_table(table, fmt):
+    """Stream a whole table as CSV or JSON Lines"""
+    if table not in EXPORT_TABLES or fmt not in FORMATS:
+        abort(404)
+    
+    return Response(stream_with_context(export_lines(table, fmt)),
+                    mimetype=FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename={table}.{fmt}'})
+
 # ============ PROFILE UPDATE & PHOTO EDITING ROUTES ============
 
 @app.route('/update-profile', methods=['POST'])
@@ -555,9 +708,10 @@ def update_photo(photo_id):
 
 # ============ FILE SERVING ============
 
-@app.route('/uploads/<filename>')
+@app.route('/uploads/<path:filename>')
 def uploaded_file(filename):
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    # Local storage sends the file; S3 storage redirects to a pre-signed URL
+    return get_storage().send(filename)
 
 # ============ API ENDPOINTS ============
 
@@ -589,16 +743,20 @@ def mark_notification_read(notification_id):
 
 @app.route('/api/leaderboard-data')
 def leaderboard_data():
-    top_photos = Photo.query.filter_by(status='approved')\
-                           .order_by(Photo.votes_count.desc())\
-                           .limit(20)\
-                           .all()
+    top_photos = db.session.execute(
+        select(Photo.id, Photo.votes_count, Photo.title, User.username)
+        .join(User, Photo.user_id == User.id)
+        .join(Round, Photo.round_id == Round.id)
+        .filter(Photo.status == 'approved', Round.status == 'open')
+        .order_by(Photo.votes_count.desc())
+        .limit(20)
+    ).all()
     
     photos_data = [{
         'id': photo.id,
         'votes_count': photo.votes_count,
         'title': photo.title,
-        'author': photo.author.username
+        'author': photo.username
     } for photo in top_photos]
     
     return jsonify({
@@ -606,6 +764,33 @@ def leaderboard_data():
         'photos': photos_data
     })
 
+@app.route('/api/previous-winners')
+def previous_winners_data():
+    return jsonify([round_result_to_dict(result) for result in get_past_winners()])
+
+@app.route('/api/rounds/<int:round_id>/results')
+def round_results(round_id):
+    contest_round = Round.query.get_or_404(round_id)
+    return jsonify({
+        'id': contest_round.id,
+        'name': contest_round.name,
+        'status': contest_round.status,
+        'closed_at': contest_round.closed_at.isoformat() if contest_round.closed_at else None,
+        'results': [round_result_to_dict(result) for result in contest_round.results]
+    })
+
+def round_result_to_dict(result):
+    return {
+        'round_id': result.round_id,
+        'rank': result.rank,
+        'photo_id': result.photo_id,
+        'title': result.title,
+        'filename': result.filename,
+        'votes': result.votes_count,
+        'comments': result.comments_count,
+        'author': result.author_name
+    }
+
 @app.route('/api/check-auth')
 def check_auth():
     return jsonify({
@@ -617,6 +802,7 @@ def check_auth():
 @app.route('/api/photo/<int:photo_id>')
 def get_photo_details(photo_id):
     photo = Photo.query.get_or_404(photo_id)
+    comments, next_cursor = get_comment_page(photo.id, limit=app.config['COMMENTS_PER_PAGE'])
     return jsonify({
         'id': photo.id,
         'title': photo.title,
@@ -624,13 +810,40 @@ def get_photo_details(photo_id):
         'votes': photo.votes_count,
         'author': photo.author.username,
         'upload_date': photo.upload_date.isoformat(),
-        'comments': [{
-            'author': comment.commenter.username,
-            'content': comment.content,
-            'time': comment.created_at.strftime('%Y-%m-%d %H:%M')
-        } for comment in photo.comments]
+        'width': photo.width,
+        'height': photo.height,
+        'file_size': photo.file_size,
+        'image_format': photo.image_format,
+        'dominant_color': photo.dominant_color,
+        'placeholder': photo.placeholder,
+        'comments_count': photo.comments_count,
+        'comments': [comment_to_dict(comment) for comment in comments],
+        'next_cursor': next_cursor
+    })
+
+@app.route('/api/photo/<int:photo_id>/comments')
+def get_photo_comments(photo_id):
+    photo = Photo.query.get_or_404(photo_id)
+    if photo.status != 'approved':
+        if not (current_user.is_authenticated and (current_user.is_admin() or current_user.id == photo.user_id)):
+            return jsonify({'error': 'Unauthorized'}), 403
+    
+    limit = min(request.args.get('limit', app.config['COMMENTS_PER_PAGE'], type=int), 100)
+    try:
+        comments, next_cursor = get_comment_page(photo_id, request.args.get('cursor'), max(limit, 1))
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    
+    return jsonify({
+        'comments': [comment_to_dict(comment) for comment in comments],
+        'next_cursor': next_cursor
     })
 
+@app.route('/api/my-votes')
+@login_required
+def my_votes():
+    return jsonify({'photo_ids': sorted(get_voted_photo_ids())})
+
 @app.route('/api/test-csrf', methods=['GET'])
 def test_csrf():
     return jsonify({
@@ -672,7 +885,17 @@ def debug_user_permissions():
         'is_voter': current_user.is_voter(),
         'is_participant': current_user.is_participant(),
         'is_admin': current_user.is_admin(),
-        'votes_count': len(current_user.votes)
+        'votes_count': len(get_voted_photo_ids())
+    })
+
+@app.route('/api/debug/template-profile')
+@login_required
+@admin_required
+def debug_template_profile():
+    """Render time per template and block (needs PROFILE_TEMPLATES=1)"""
+    return jsonify({
+        'enabled': app.config['PROFILE_TEMPLATES'],
+        'templates': template_profile()
     })
 
 @app.route('/api/debug/vote-status/<int:photo_id>')
@@ -681,7 +904,7 @@ def debug_vote_status(photo_id):
     """Debug endpoint to check vote status for current user"""
     photo = Photo.query.get_or_404(photo_id)
     
-    existing_vote = Vote.query.filter_by(user_id=current_user.id, photo_id=photo_id).first()
+    has_voted = photo_id in get_voted_photo_ids()
     
     return jsonify({
         'user_id': current_user.id,
@@ -692,12 +915,12 @@ def debug_vote_status(photo_id):
         'photo_title': photo.title,
         'photo_status': photo.status,
         'photo_owner': photo.user_id,
-        'has_voted': existing_vote is not None,
+        'has_voted': has_voted,
         'can_vote': (
             current_user.is_voter() and 
             photo.status == 'approved' and 
             photo.user_id != current_user.id and 
-            existing_vote is None
+            not has_voted
         )
     })
 # ============ MAIN ENTRY POINT ============
@@ -0,0 +1,263 @@
+"""
+Load benchmark for Snap Showdown.
+
+Starts the app under each server mode, fires concurrent requests at a set
+of pages and prints throughput and latency percentiles:
+
+    python benchmark.py                         # dev server vs. serve.py
+    python benchmark.py --modes prod --requests 2000 --concurrency 50
+    python benchmark.py --modes prod --api --workers 1 --concurrency 100
+    python benchmark.py --modes prod --login-storm
+    python benchmark.py --modes prod --profile-templates
+
+Alongside the totals a per-page table shows response size and, with
+--profile-templates, template render time (from the Server-Timing header).
+Profiling adds its own overhead, so leave it off when comparing throughput.
+
+Page runs are read-only. --api also posts votes and comments as
+--login-email; the server then runs on a scratch copy of the database
+(DATABASE_URL), so the normal database is never written to.
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+
+DEFAULT_PATHS = ['/', '/gallery', '/leaderboard', '/api/leaderboard-data']
+
+# JSON and write endpoints; compare with --workers 1 and rising
+# --concurrency to see how many connections a single worker sustains.
+# 'POST ...' entries are sent logged in, with the CSRF token.
+API_PATHS = ['/api/leaderboard-data', '/api/check-auth',
+             'POST /vote/{photo_id}', 'POST /comment/{photo_id}']
+
+SERVERS = {
+    'dev': lambda port, args: [sys.executable, '-c',
+                               'from app import app; '
+                               f'app.run(debug=True, use_reloader=False, port={port})'],
+    'prod': lambda port, args: [sys.executable, 'serve.py', '--bind', f'127.0.0.1:{port}',
+                                '--workers', str(args.workers), '--threads', str(args.threads)],
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for_server(base_url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(base_url + '/api/check-auth', timeout=1).read()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def fetch(opener, base_url, path, csrf_token=None):
+    """Time one request. path is a URL path, or 'POST /path' for a form post."""
+    method, _, target = path.rpartition(' ')
+    data = urllib.parse.urlencode({'content': 'Benchmark comment'}).encode() if method == 'POST' else None
+    request = urllib.request.Request(base_url + target, data=data, method=method or 'GET',
+                                     headers={'X-CSRFToken': csrf_token} if csrf_token else {})
+    start = time.perf_counter()
+    render_ms = None
+    try:
+        with opener.open(request, timeout=30) as response:
+            size = len(response.read())
+            ok = response.status == 200
+            timing = re.search(r'render;dur=([\d.]+)', response.headers.get('Server-Timing', ''))
+            if timing:
+                render_ms = float(timing.group(1))
+    except urllib.error.HTTPError as error:
+        # A repeat vote is answered 400 "already voted" after running the vote path
+        size, ok = len(error.read()), method == 'POST' and error.code < 500
+    except OSError:
+        size, ok = 0, False
+    return time.perf_counter() - start, size, ok, render_ms
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def page_stats(results):
+    latencies = [r[0] for r in results if r[2]]
+    render_times = [r[3] for r in results if r[3] is not None]
+    return {
+        'requests': len(results),
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'render_ms': sum(render_times) / len(render_times) if render_times else 0.0,
+        'bytes': sum(r[1] for r in results) / len(results) if results else 0,
+    }
+
+
+def run_load(base_url, paths, total_requests, concurrency, opener=None, csrf_token=None):
+    opener = opener or urllib.request.build_opener()
+    request_paths = [paths[i % len(paths)] for i in range(total_requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda path: fetch(opener, base_url, path, csrf_token), request_paths))
+    elapsed = time.perf_counter() - start
+
+    latencies = [r[0] for r in results if r[2]]
+    pages = {
+        path: page_stats([r for r, p in zip(results, request_paths) if p == path])
+        for path in paths
+    }
+    return {
+        'pages': pages,
+        'requests': total_requests,
+        'errors': sum(1 for r in results if not r[2]),
+        'rps': total_requests / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'avg_bytes': sum(r[1] for r in results) / len(results) if results else 0,
+    }
+
+
+def login_once(base_url, email, password):
+    """Log in like a browser would. Returns the cookie-carrying opener and the CSRF token."""
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor())
+    page = opener.open(base_url + '/login', timeout=30).read().decode()
+    token = re.search(r'name="csrf_token"[^>]*value="([^"]+)"', page).group(1)
+    data = urllib.parse.urlencode({'csrf_token': token, 'email': email, 'password': password})
+    opener.open(base_url + '/login', data=data.encode(), timeout=30).read()
+    return opener, token
+
+
+def login_for_writes(base_url, args):
+    opener, token = login_once(base_url, args.login_email, args.login_password)
+    status = json.loads(opener.open(base_url + '/api/check-auth', timeout=30).read())
+    if not status['authenticated']:
+        raise RuntimeError(f'could not log in as {args.login_email}')
+    return opener, token
+
+
+def login_storm(mode, base_url, args):
+    """Gallery latency on its own, then again while logins hammer the server."""
+    quiet = run_load(base_url, ['/gallery'], args.requests, args.concurrency)
+
+    stop = threading.Event()
+    logins = []
+
+    def keep_logging_in():
+        while not stop.is_set():
+            try:
+                login_once(base_url, args.login_email, args.login_password)
+                logins.append(True)
+            except (OSError, AttributeError):
+                logins.append(False)
+
+    storm = [threading.Thread(target=keep_logging_in) for _ in range(args.login_concurrency)]
+    start = time.perf_counter()
+    for thread in storm:
+        thread.start()
+    during = run_load(base_url, ['/gallery'], args.requests, args.concurrency)
+    stop.set()
+    for thread in storm:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    print(f"Logins: {logins.count(True)} ok, {logins.count(False)} failed, "
+          f"{logins.count(True) / elapsed:.1f}/s with {args.login_concurrency} clients")
+    return {f'{mode} quiet': quiet, f'{mode} storm': during}
+
+
+def benchmark_mode(mode, args):
+    paths, total_requests, concurrency = args.paths, args.requests, args.concurrency
+    port = free_port()
+    env = dict(os.environ)
+    if args.profile_templates:
+        env['PROFILE_TEMPLATES'] = '1'
+    writes = any(path.startswith('POST ') for path in paths)
+    scratch_dir = None
+    if writes:
+        scratch_dir = tempfile.mkdtemp()
+        database = Config.SQLALCHEMY_DATABASE_URI.replace('sqlite:///', '', 1)
+        env['DATABASE_URL'] = 'sqlite:///' + shutil.copy(database, scratch_dir)
+    process = subprocess.Popen(SERVERS[mode](port, args), env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        if not wait_for_server(base_url):
+            raise RuntimeError(f'{mode} server did not start on port {port}')
+        opener, token = login_for_writes(base_url, args) if writes else (None, None)
+        # One untimed pass so neither mode is measured cold
+        run_load(base_url, paths, len(paths), 1, opener, token)
+        if args.login_storm:
+            return login_storm(mode, base_url, args)
+        return {mode: run_load(base_url, paths, total_requests, concurrency, opener, token)}
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+        if scratch_dir:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+
+def print_results(results):
+    columns = ['requests', 'errors', 'rps', 'p50_ms', 'p95_ms', 'p99_ms', 'avg_bytes']
+    print(f"{'mode':<14}" + ''.join(f'{c:>12}' for c in columns))
+    for mode, stats in results.items():
+        print(f'{mode:<14}' + ''.join(f'{stats[c]:>12.1f}' for c in columns))
+
+    page_columns = ['requests', 'p50_ms', 'render_ms', 'bytes']
+    for mode, stats in results.items():
+        print(f"\n{mode + ' pages':<28}" + ''.join(f'{c:>12}' for c in page_columns))
+        for path, page in stats['pages'].items():
+            print(f'{path:<28}' + ''.join(f'{page[c]:>12.1f}' for c in page_columns))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark Snap Showdown server modes.')
+    parser.add_argument('--modes', nargs='+', choices=sorted(SERVERS), default=['dev', 'prod'])
+    parser.add_argument('--paths', nargs='+', default=DEFAULT_PATHS)
+    parser.add_argument('--api', action='store_true',
+                        help='Only hit the JSON API endpoints, including vote and comment posts')
+    parser.add_argument('--photo-id', type=int, default=1, help='Photo that --api votes and comments on')
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=Config.SERVER_WORKERS,
+                        help='prod workers; use 1 to measure connections per worker')
+    parser.add_argument('--threads', type=int, default=Config.SERVER_THREADS)
+    parser.add_argument('--profile-templates', action='store_true',
+                        help='Start servers with PROFILE_TEMPLATES=1 to report render times')
+    parser.add_argument('--login-storm', action='store_true',
+                        help='Measure gallery latency while many clients log in')
+    parser.add_argument('--login-concurrency', type=int, default=20)
+    parser.add_argument('--login-email', default='voter@example.com')
+    parser.add_argument('--login-password', default='password123')
+    args = parser.parse_args(argv)
+    if args.api:
+        args.paths = [path.format(photo_id=args.photo_id) for path in API_PATHS]
+
+    results = {}
+    for mode in args.modes:
+        print(f'Benchmarking {mode} server...')
+        results.update(benchmark_mode(mode, args))
+    print_results(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Maintenance commands, run with the flask CLI:
+
+    flask --app app migrate-uploads
+    flask --app app close-round --name "Winter 2026"
+    flask --app app compact-votes
+    flask --app app export-data photos --format jsonl --output photos.jsonl
+    flask --app app import-data photos photos.jsonl
+    flask --app app backfill-image-metadata
+    flask --app app purge-idempotency-keys
+"""
+import io
+import os
+import click
+from PIL import Image
+from config import Config
+from storage import LocalStorage, get_storage
+from rounds import close_round, compact_closed_rounds
+from exports import EXPORT_TABLES, FORMATS, export_lines, import_rows
+from models import db, Photo
+from utils import image_metadata
+from idempotency import purge_expired_keys
+
+def register_commands(app):
+    @app.cli.command('migrate-uploads')
+    @click.option('--overwrite', is_flag=True, help='Copy files that already exist in the target.')
+    def migrate_uploads(overwrite):
+        """Copy every file in UPLOAD_FOLDER to the configured storage backend."""
+        source = LocalStorage(Config.UPLOAD_FOLDER)
+        target = get_storage()
+        if isinstance(target, LocalStorage):
+            raise click.ClickException('STORAGE_BACKEND is local; set it to the backend to migrate to.')
+        
+        copied = skipped = 0
+        for key in source.keys():
+            if not overwrite and target.exists(key):
+                skipped += 1
+                continue
+            with source.open(key) as f:
+                target.save(f, key)
+            copied += 1
+            click.echo(f"Copied {key}")
+        
+        click.echo(f"Done: {copied} copied, {skipped} already present.")
+    
+    @app.cli.command('close-round')
+    @click.option('--name', help='Name of the round that opens next.')
+    def close_round_command(name):
+        """Archive the open round's ranking and start the next round."""
+        closed = close_round(name)
+        click.echo(f"{closed.name} closed with {len(closed.results)} ranked photos.")
+    
+    @app.cli.command('compact-votes')
+    def compact_votes():
+        """Delete vote rows of closed rounds (their totals are kept in round_results)."""
+        click.echo(f"Deleted {compact_closed_rounds()} archived votes.")
+    
+    @app.cli.command('export-data')
+    @click.argument('table', type=click.Choice(list(EXPORT_TABLES)))
+    @click.option('--format', 'fmt', type=click.Choice(list(FORMATS)), default='csv')
+    @click.option('--output', type=click.File('w', encoding='utf-8', lazy=False), default='-',
+                  help='File to write (default: stdout).')
+    def export_data(table, fmt, output):
+        """Stream a table to CSV or JSON Lines."""
+        for chunk in export_lines(table, fmt):
+            output.write(chunk)
+    
+    @app.cli.command('import-data')
+    @click.argument('table', type=click.Choice(list(EXPORT_TABLES)))
+    @click.argument('source', type=click.File('r', encoding='utf-8'))
+    @click.option('--format', 'fmt', type=click.Choice(list(FORMATS)),
+                  help='Defaults to the file extension.')
+    def import_data(table, source, fmt):
+        """Bulk insert rows from an export-data file (ids are kept).
+
+        Import users, rounds, photos, votes, comments, then round-results.
+        """
+        fmt = fmt or os.path.splitext(source.name)[1].lstrip('.')
+        if fmt not in FORMATS:
+            raise click.ClickException('Cannot tell the format from the file name; pass --format.')
+        try:
+            count = import_rows(table, source, fmt)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        click.echo(f"Imported {count} {table} rows.")
+    
+    @app.cli.command('backfill-image-metadata')
+    @click.option('--all', 'refresh_all', is_flag=True, help='Recompute photos that already have metadata.')
+    def backfill_image_metadata(refresh_all):
+        """Store size, colour and placeholder of photos uploaded before they were recorded."""
+        query = Photo.query if refresh_all else Photo.query.filter(Photo.width.is_(None))
+        storage = get_storage()
+        
+        updated = failed = 0
+        for photo in query.order_by(Photo.id).all():
+            try:
+                with storage.open(photo.filename) as f:
+                    data = f.read()
+                img = Image.open(io.BytesIO(data))
+                metadata = image_metadata(img, len(data), img.format)
+            except (OSError, ValueError) as e:
+                failed += 1
+                click.echo(f"Skipped {photo.filename}: {e}")
+                continue
+            
+            for column, value in metadata.items():
+                setattr(photo, column, value)
+            updated += 1
+            if updated % 50 == 0:
+                db.session.commit()
+        
+        db.session.commit()
+        click.echo(f"Done: {updated} updated, {failed} skipped.")
+    
+    @app.cli.command('purge-idempotency-keys')
+    def purge_idempotency_keys():
+        """Delete stored responses whose idempotency keys have expired."""
+        click.echo(f"Deleted {purge_expired_keys()} expired idempotency keys.")
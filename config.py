@@ -1,17 +1,56 @@
 import os
+import multiprocessing
 from datetime import timedelta
 
 basedir = os.path.abspath(os.path.dirname(__file__))
 
 class Config:
     SECRET_KEY = 'your-secret-key-here-change-in-production'
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(basedir, 'database', 'app.db')
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///' + os.path.join(basedir, 'database', 'app.db'))
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    NOTIFICATION_WORKERS = 2
+    MAX_BATCH_VOTES = 50
+    COMMENTS_PER_PAGE = 20
+    EXPORT_CHUNK_SIZE = 1000
+    PLACEHOLDER_SIZE = (16, 16)
+    
+    # Idempotency keys: how long responses are kept, and after how long a
+    # reservation whose request never finished may be taken over
+    IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+    
+    # Templates: compiled bytecode is cached on disk; profiling adds Server-Timing headers
+    TEMPLATE_CACHE_DIR = os.path.join(basedir, 'cache', 'jinja')
+    PROFILE_TEMPLATES = os.environ.get('PROFILE_TEMPLATES') == '1'
     UPLOAD_FOLDER = os.path.join(basedir, 'static', 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+    
+    # Upload storage: 'local' (UPLOAD_FOLDER) or 's3' (any S3-compatible service, e.g. MinIO)
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'local')
+    S3_BUCKET = os.environ.get('S3_BUCKET', 'snapshowdown-uploads')
+    S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL')
+    S3_ACCESS_KEY = os.environ.get('S3_ACCESS_KEY')
+    S3_SECRET_KEY = os.environ.get('S3_SECRET_KEY')
+    S3_REGION = os.environ.get('S3_REGION', 'us-east-1')
+    S3_URL_EXPIRES = int(os.environ.get('S3_URL_EXPIRES', 3600))
     PERMANENT_SESSION_LIFETIME = timedelta(hours=2)
     
+    # Password hashing (see passwords.py); hashes made with another method are upgraded at login
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', multiprocessing.cpu_count()))  # per host
+    PASSWORD_HASH_CONCURRENCY = int(os.environ.get('PASSWORD_HASH_CONCURRENCY', 0))  # per process; 0: SERVER_THREADS // 2
+    PASSWORD_HASH_WAIT = 5  # seconds to wait for a free hashing slot
+    PASSWORD_HASH_LOCK_DIR = os.path.join(basedir, 'cache', 'hash-slots')
+    
+    # Production server settings (used by serve.py)
+    SERVER_BIND = os.environ.get('SERVER_BIND', '0.0.0.0:8000')
+    SERVER_WORKERS = int(os.environ.get('SERVER_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+    SERVER_THREADS = int(os.environ.get('SERVER_THREADS', 4))
+    SERVER_TIMEOUT = int(os.environ.get('SERVER_TIMEOUT', 30))
+    SERVER_GRACEFUL_TIMEOUT = int(os.environ.get('SERVER_GRACEFUL_TIMEOUT', 30))
+    SERVER_MAX_REQUESTS = int(os.environ.get('SERVER_MAX_REQUESTS', 2000))
+    IDEMPOTENCY_LEASE = SERVER_TIMEOUT  # a request can't outlive its worker's timeout
+    
     # Ensure upload directory exists
     if not os.path.exists(UPLOAD_FOLDER):
         os.makedirs(UPLOAD_FOLDER)
\ No newline at end of file
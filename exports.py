@@ -0,0 +1,151 @@
+"""
+Streaming export and bulk import of contest data as CSV or JSON Lines.
+
+Exports read rows in chunks of EXPORT_CHUNK_SIZE with a streaming cursor
+(yield_per), so memory use stays flat however large the table is. Imports
+read the file lazily and insert in chunks with executemany. Primary keys are
+kept, so an export from one instance can seed another; import the tables in
+the order of EXPORT_TABLES, so rows only point at rows already there.
+
+Users are exported without password hashes or emails. Imported accounts get
+an unusable password and a placeholder address, so they keep their photos
+and comments but can't log in. Accounts already on the instance (the seeded
+admin) are kept. Imported rounds replace local rounds with the same id, which
+on a fresh instance is just the empty round 1. Round results are only
+imported for rounds that are closed on this instance.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from sqlalchemy import Boolean, DateTime, Integer, insert, select
+from config import Config
+from models import db, User, Round, Photo, Vote, Comment, RoundResult
+
+EXPORT_TABLES = {
+    'users': User,
+    'rounds': Round,
+    'photos': Photo,
+    'votes': Vote,
+    'comments': Comment,
+    'round-results': RoundResult,
+}
+
+# Columns that never leave the instance
+EXCLUDED_COLUMNS = {
+    'users': {'password_hash', 'email'},
+}
+
+# What an import does with rows whose keys are already taken (SQLite)
+ON_CONFLICT = {
+    'users': 'OR IGNORE',
+    'rounds': 'OR REPLACE',
+}
+
+def _imported_user(row):
+    # '!' is never a valid werkzeug hash, and .invalid is a reserved domain
+    return {'email': f"user-{row['id']}@imported.invalid", 'password_hash': '!'}
+
+# Values for required columns that aren't exported
+IMPORT_DEFAULTS = {
+    'users': _imported_user,
+}
+
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+def _columns(name):
+    excluded = EXCLUDED_COLUMNS.get(name, set())
+    return [column for column in EXPORT_TABLES[name].__table__.columns if column.name not in excluded]
+
+def _to_text(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def iter_rows(name):
+    """Yield each row of an export table as a dict, reading chunk by chunk."""
+    columns = _columns(name)
+    query = select(*columns).order_by(columns[0])\
+                            .execution_options(yield_per=Config.EXPORT_CHUNK_SIZE)
+    for row in db.session.execute(query):
+        yield {column.name: _to_text(value) for column, value in zip(columns, row)}
+
+def export_lines(name, fmt):
+    """Yield the export as text chunks, ready for a streaming response or a file."""
+    if fmt == 'jsonl':
+        for row in iter_rows(name):
+            yield json.dumps(row) + '\n'
+        return
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=[column.name for column in _columns(name)])
+    writer.writeheader()
+    for i, row in enumerate(iter_rows(name), 1):
+        writer.writerow(row)
+        if i % Config.EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def _parse_value(column, value):
+    if value is None or (value == '' and column.nullable):
+        return None
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value) if isinstance(value, str) else value
+    if isinstance(column.type, Boolean):
+        return value in (True, 1, '1', 'True', 'true')
+    if isinstance(column.type, Integer):
+        return int(value)
+    return value
+
+def _read_rows(fileobj, fmt):
+    if fmt == 'jsonl':
+        for line in fileobj:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        yield from csv.DictReader(fileobj)
+
+def _closed_round_ids():
+    return set(db.session.scalars(select(Round.id).where(Round.status == 'closed')))
+
+def import_rows(name, fileobj, fmt):
+    """Bulk insert rows from an export file. Returns the number of rows read.
+
+    Raises ValueError, and imports nothing, if a round result belongs to a
+    round that isn't closed on this instance.
+    """
+    table = EXPORT_TABLES[name].__table__
+    columns = {column.name: column for column in _columns(name)}
+    statement = insert(table)
+    if name in ON_CONFLICT:
+        statement = statement.prefix_with(ON_CONFLICT[name])
+    defaults = IMPORT_DEFAULTS.get(name)
+    closed_rounds = _closed_round_ids() if name == 'round-results' else None
+
+    count = 0
+    chunk = []
+    try:
+        for row in _read_rows(fileobj, fmt):
+            row = {key: _parse_value(columns[key], value)
+                   for key, value in row.items() if key in columns}
+            if defaults:
+                row.update(defaults(row))
+            if closed_rounds is not None and row['round_id'] not in closed_rounds:
+                raise ValueError(f"Round {row['round_id']} is not a closed round here; "
+                                 "import rounds before round-results.")
+            chunk.append(row)
+            if len(chunk) >= Config.EXPORT_CHUNK_SIZE:
+                db.session.execute(statement, chunk)
+                count += len(chunk)
+                chunk = []
+        if chunk:
+            db.session.execute(statement, chunk)
+            count += len(chunk)
+    except Exception:
+        db.session.rollback()
+        raise
+    db.session.commit()
+    return count
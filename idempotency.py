@@ -0,0 +1,178 @@
+"""
+Idempotency keys for retried writes.
+
+A client sends an Idempotency-Key header (or an idempotency_key form field)
+with a POST. When the request succeeds, its JSON or redirect response is
+stored against the key, and retries with the same key get that response
+back without running the view again. A retried vote or upload is then a
+cheap no-op instead of an error or a duplicate. Errors and rendered pages are
+not stored, so the client can retry them for real with the same key.
+
+Views that write in one database transaction (vote) add the stored response
+to that transaction with stored_response(), so a key costs no extra write.
+Other views use @idempotent(...), which reserves the key before the view runs. A
+retry that arrives while the reservation is held gets a 409 with
+Retry-After straight away. A reservation whose request never finished (its
+worker was killed or crashed) is reclaimed after IDEMPOTENCY_LEASE seconds.
+
+Browser form posts (key in the form, no header) get pages, not JSON: a
+resubmitted form that is still being handled is redirected to the view's
+form_redirect endpoint with a message, and a form whose key was used for
+another path is sent back to a fresh copy of the form.
+
+Keys are per user and expire after IDEMPOTENCY_KEY_TTL seconds.
+"""
+import uuid
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import current_app, request, jsonify, abort, make_response, flash, redirect, url_for
+from flask_login import current_user
+from sqlalchemy import or_, and_, update
+from sqlalchemy.exc import IntegrityError
+from models import db, IdempotencyKey
+
+MAX_KEY_LENGTH = 64
+
+def new_idempotency_key():
+    return uuid.uuid4().hex
+
+def request_key():
+    """The current request's idempotency key, or None."""
+    if request.method != 'POST':
+        return None
+    key = request.headers.get('Idempotency-Key') or request.form.get('idempotency_key')
+    if key and len(key) > MAX_KEY_LENGTH:
+        abort(make_response(jsonify({'success': False, 'error': 'Idempotency-Key is too long.'}), 400))
+    return key or None
+
+def _ttl_cutoff():
+    return datetime.utcnow() - timedelta(seconds=current_app.config['IDEMPOTENCY_KEY_TTL'])
+
+def _lease_cutoff():
+    return datetime.utcnow() - timedelta(seconds=current_app.config['IDEMPOTENCY_LEASE'])
+
+def is_expired(record):
+    if record.status_code is None:
+        return record.created_at < _lease_cutoff()
+    return record.created_at < _ttl_cutoff()
+
+def _is_form_post():
+    return 'Idempotency-Key' not in request.headers and not request.is_json
+
+def stored_reply(record, form_redirect=None):
+    """The response for a retry that found record: the stored response, or why it can't have it.
+
+    With form_redirect, browser form posts are answered with a flashed
+    message and a redirect instead of a JSON error.
+    """
+    form_post = form_redirect is not None and _is_form_post()
+    if record.request_path != request.path:
+        if form_post:
+            flash('This form has expired. Please submit it again.', 'error')
+            return redirect(request.path)
+        return jsonify({'success': False, 'error': 'Idempotency-Key was already used for another request.'}), 422
+    if record.status_code is None:
+        if form_post:
+            flash('Your submission is still being processed. It will appear here shortly.', 'info')
+            return redirect(url_for(form_redirect))
+        response = jsonify({'success': False, 'error': 'A request with this Idempotency-Key is still in progress.'})
+        response.status_code = 409
+        response.headers['Retry-After'] = '1'
+        return response
+
+    response = current_app.response_class(record.body or '', status=record.status_code,
+                                          content_type=record.content_type)
+    if record.location:
+        response.headers['Location'] = record.location
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+def is_storable(response):
+    return response.status_code < 400 and (response.is_json or response.status_code >= 300)
+
+def stored_response(user_id, key, response, record=None):
+    """An IdempotencyKey row holding response (reusing record if given), ready to add to a session."""
+    record = record or IdempotencyKey(user_id=user_id, key=key)
+    record.request_path = request.path
+    record.status_code = response.status_code
+    record.content_type = response.content_type
+    record.location = response.headers.get('Location')
+    record.body = response.get_data(as_text=True) if response.is_json else None
+    record.created_at = datetime.utcnow()
+    return record
+
+def _reserve(key):
+    """Reserve key for this request and return None, or return the record holding it."""
+    while True:
+        db.session.add(IdempotencyKey(user_id=current_user.id, key=key, request_path=request.path))
+        try:
+            db.session.commit()
+            return None
+        except IntegrityError:
+            db.session.rollback()
+        
+        # Take over the key if its response has expired or its request never finished
+        reclaimed = db.session.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.user_id == current_user.id, IdempotencyKey.key == key,
+                   or_(IdempotencyKey.created_at < _ttl_cutoff(),
+                       and_(IdempotencyKey.status_code.is_(None), IdempotencyKey.created_at < _lease_cutoff())))
+            .values(request_path=request.path, status_code=None, content_type=None,
+                    location=None, body=None, created_at=datetime.utcnow())
+        )
+        db.session.commit()
+        if reclaimed.rowcount:
+            return None
+        record = db.session.get(IdempotencyKey, (current_user.id, key), populate_existing=True)
+        if record is not None:
+            return record
+        # Released in the meantime; try again
+
+def _release(key):
+    db.session.rollback()
+    record = db.session.get(IdempotencyKey, (current_user.id, key))
+    if record is not None:
+        db.session.delete(record)
+        db.session.commit()
+
+def idempotent(form_redirect):
+    """Reserve the request's key before a sync view runs and store its response after.
+
+    form_redirect is the endpoint a resubmitted browser form is sent to while
+    the first submission is still running.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = request_key()
+            if key is None:
+                return view(*args, **kwargs)
+
+            record = _reserve(key)
+            if record is not None:
+                return stored_reply(record, form_redirect)
+
+            try:
+                response = current_app.make_response(view(*args, **kwargs))
+            except Exception:
+                _release(key)
+                raise
+            if not is_storable(response):
+                _release(key)
+                return response
+
+            db.session.rollback()
+            record = db.session.get(IdempotencyKey, (current_user.id, key))
+            if record is not None:
+                stored_response(current_user.id, key, response, record)
+                db.session.commit()
+            return response
+        return wrapper
+    return decorator
+
+def purge_expired_keys():
+    """Delete keys older than IDEMPOTENCY_KEY_TTL. Returns the count."""
+    deleted = IdempotencyKey.query.filter(IdempotencyKey.created_at < _ttl_cutoff())\
+                                  .delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
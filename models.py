@@ -1,7 +1,9 @@
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from passwords import hash_password, verify_password
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
 
 db = SQLAlchemy()
 
@@ -23,10 +25,10 @@ class User(UserMixin, db.Model):
     comments = db.relationship('Comment', backref='commenter', lazy=True)
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
     
     def is_admin(self):
         return self.role == 'admin'
@@ -48,15 +50,59 @@ class Photo(db.Model):
     filename = db.Column(db.String(200), nullable=False)
     status = db.Column(db.String(20), default='pending')  # pending, approved, rejected
     votes_count = db.Column(db.Integer, default=0)
+    comments_count = db.Column(db.Integer, default=0, server_default='0')  # excludes removed comments
     upload_date = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Stored image metadata, filled in by save_photo (or flask backfill-image-metadata)
+    width = db.Column(db.Integer)
+    height = db.Column(db.Integer)
+    file_size = db.Column(db.Integer)  # bytes
+    image_format = db.Column(db.String(10))
+    dominant_color = db.Column(db.String(7))  # #rrggbb
+    placeholder = db.Column(db.Text)  # tiny JPEG data URI shown while the image loads
+    
     # Foreign keys
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    round_id = db.Column(db.Integer, db.ForeignKey('rounds.id'), index=True)
     
     # Relationships
     votes = db.relationship('Vote', backref='photo', lazy=True, cascade='all, delete-orphan')
     comments = db.relationship('Comment', backref='photo', lazy=True, cascade='all, delete-orphan')
 
+class Round(db.Model):
+    __tablename__ = 'rounds'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    status = db.Column(db.String(20), default='open')  # open, closed
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    closed_at = db.Column(db.DateTime)
+    
+    # Relationships
+    photos = db.relationship('Photo', backref='round', lazy=True)
+    results = db.relationship('RoundResult', backref='round', lazy=True, order_by='RoundResult.rank')
+
+class RoundResult(db.Model):
+    """Final ranking of a closed round. Written once when the round closes, never updated."""
+    __tablename__ = 'round_results'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    round_id = db.Column(db.Integer, db.ForeignKey('rounds.id'), nullable=False)
+    rank = db.Column(db.Integer, nullable=False)
+    
+    # Copied from the photo and its author at closing time
+    photo_id = db.Column(db.Integer, db.ForeignKey('photos.id'))
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text)
+    filename = db.Column(db.String(200), nullable=False)
+    votes_count = db.Column(db.Integer, default=0)
+    comments_count = db.Column(db.Integer, default=0)
+    upload_date = db.Column(db.DateTime)
+    author_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    author_name = db.Column(db.String(80))
+    
+    __table_args__ = (db.UniqueConstraint('round_id', 'rank', name='unique_round_rank'),)
+
 class Vote(db.Model):
     __tablename__ = 'votes'
     
@@ -79,6 +125,9 @@ class Comment(db.Model):
     # Foreign keys
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     photo_id = db.Column(db.Integer, db.ForeignKey('photos.id'), nullable=False)
+    
+    # Comment threads are read per photo in date order
+    __table_args__ = (db.Index('ix_comments_photo_created', 'photo_id', 'created_at'),)
 
 class Notification(db.Model):
     __tablename__ = 'notifications'
@@ -90,4 +139,64 @@ class Notification(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationship
-    user = db.relationship('User', backref='notifications', lazy=True)
\ No newline at end of file
+    user = db.relationship('User', backref='notifications', lazy=True)
+
+class IdempotencyKey(db.Model):
+    """Stored response of a write request, replayed when the client retries with the same key."""
+    __tablename__ = 'idempotency_keys'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    key = db.Column(db.String(64), primary_key=True)
+    request_path = db.Column(db.String(200), nullable=False)
+    status_code = db.Column(db.Integer)  # None while the first request is still running
+    content_type = db.Column(db.String(100))
+    location = db.Column(db.String(500))
+    body = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+# Fill in columns added to an existing database by upgrade_schema()
+COLUMN_BACKFILLS = {
+    ('photos', 'comments_count'): ["""
+        UPDATE photos SET comments_count = (
+            SELECT COUNT(*) FROM comments
+            WHERE comments.photo_id = photos.id AND comments.status != 'removed'
+        )
+    """],
+    # Photos from before contest rounds existed belong to the first round
+    ('photos', 'round_id'): ["""
+        INSERT INTO rounds (name, status, started_at)
+        SELECT 'Round 1', 'open', CURRENT_TIMESTAMP
+        WHERE NOT EXISTS (SELECT 1 FROM rounds)
+    """, """
+        UPDATE photos SET round_id = (SELECT MAX(id) FROM rounds WHERE status = 'open')
+    """],
+}
+
+# Columns removed from the models, with the data they held
+DROPPED_COLUMNS = [
+    # Round snapshots used to copy the author's email; author_id is enough
+    ('round_results', 'author_email'),
+]
+
+def upgrade_schema():
+    """Add columns and indexes that db.create_all() won't add to existing tables, and drop removed columns."""
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                column_ddl = CreateColumn(column).compile(dialect=db.engine.dialect)
+                db.session.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column_ddl}'))
+                for statement in COLUMN_BACKFILLS.get((table.name, column.name), []):
+                    db.session.execute(text(statement))
+                print(f"Added column: {table.name}.{column.name}")
+        db.session.commit()
+        
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+    
+    for table_name, column_name in DROPPED_COLUMNS:
+        if column_name in {column['name'] for column in inspector.get_columns(table_name)}:
+            db.session.execute(text(f'ALTER TABLE {table_name} DROP COLUMN {column_name}'))
+            db.session.commit()
+            print(f"Dropped column: {table_name}.{column_name}")
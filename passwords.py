@@ -0,0 +1,104 @@
+"""
+Password hashing off the request threads.
+
+Hashing is deliberately slow, so a wave of logins could otherwise take every
+worker thread and stall gallery and vote traffic, or every CPU core. Two
+limits stop that:
+
+- Per app process, at most PASSWORD_HASH_CONCURRENCY request threads may
+  hash at once. By default this is half of SERVER_THREADS, and it is always
+  fewer than SERVER_THREADS, so a gthread worker keeps threads free for
+  other pages.
+- Per host, at most PASSWORD_HASH_WORKERS hashes run at once across every
+  gunicorn worker (default: one per CPU). Each running hash holds a lock on
+  one of that many slot files in PASSWORD_HASH_LOCK_DIR. The OS drops the
+  lock if a worker dies mid-hash, so a killed worker can't leak a slot.
+
+Under gunicorn, serve.py calls start_pool() in each worker right after the
+fork, and hashes run in that worker's small process pool. The pool is started
+with forkserver, as forking a multi-threaded worker is unsafe; its processes
+import serve.py as their main module, never app.py. Without a pool (the
+development server, CLI commands, startup) hashes run on the calling thread,
+within the same limits. A request that can't get both slots within
+PASSWORD_HASH_WAIT seconds gets HashingBusy.
+
+PASSWORD_HASH_METHOD is a full werkzeug method string (with parameters).
+Stored hashes made with anything else are upgraded on the user's next login.
+"""
+import multiprocessing
+import multiprocessing.forkserver
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+from config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the per-process limit applies
+    fcntl = None
+
+class HashingBusy(Exception):
+    """Too many password hashes are already running."""
+
+def hashing_concurrency():
+    """Hashing threads allowed per process; always fewer than the worker's threads."""
+    threads = Config.SERVER_THREADS
+    configured = Config.PASSWORD_HASH_CONCURRENCY or threads // 2
+    return max(1, min(configured, threads - 1))
+
+_concurrency = hashing_concurrency()
+_slots = threading.BoundedSemaphore(_concurrency)
+_pool = None
+
+def start_pool():
+    """Start this process's hashing pool. Call it in a freshly forked worker, before its threads start."""
+    global _pool
+    context = multiprocessing.get_context('forkserver')
+    # Pool processes only run werkzeug's hash functions
+    context.set_forkserver_preload(['werkzeug.security'])
+    multiprocessing.forkserver.ensure_running()
+    _pool = ProcessPoolExecutor(max_workers=_concurrency, mp_context=context)
+
+def _acquire_host_slot(deadline):
+    """Lock a free slot file and return it, or None when host-wide limiting isn't available."""
+    if fcntl is None:
+        return None
+    os.makedirs(Config.PASSWORD_HASH_LOCK_DIR, exist_ok=True)
+    while True:
+        for slot in range(Config.PASSWORD_HASH_WORKERS):
+            lock_file = open(os.path.join(Config.PASSWORD_HASH_LOCK_DIR, f'{slot}.lock'), 'a')
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return lock_file
+            except BlockingIOError:
+                lock_file.close()
+        if time.monotonic() >= deadline:
+            raise HashingBusy()
+        time.sleep(0.01)
+
+def _run(func, *args, **kwargs):
+    deadline = time.monotonic() + Config.PASSWORD_HASH_WAIT
+    if not _slots.acquire(timeout=Config.PASSWORD_HASH_WAIT):
+        raise HashingBusy()
+    try:
+        host_slot = _acquire_host_slot(deadline)
+        try:
+            if _pool is None:
+                return func(*args, **kwargs)
+            return _pool.submit(func, *args, **kwargs).result()
+        finally:
+            if host_slot is not None:
+                host_slot.close()  # closing the file releases the lock
+    finally:
+        _slots.release()
+
+def hash_password(password):
+    return _run(generate_password_hash, password, method=Config.PASSWORD_HASH_METHOD)
+
+def verify_password(password_hash, password):
+    return _run(check_password_hash, password_hash, password)
+
+def needs_rehash(password_hash):
+    return password_hash.split('$', 1)[0] != Config.PASSWORD_HASH_METHOD
@@ -0,0 +1,77 @@
+"""
+Template render profiling, switched on with PROFILE_TEMPLATES=1.
+
+While enabled, every response rendered from a template carries a
+Server-Timing header with its render time, and the render time of each
+template and each {% block %} is totalled in-process. Admins can read the
+totals from /api/debug/template-profile.
+"""
+import threading
+from time import perf_counter
+from flask import g, before_render_template, template_rendered
+from jinja2 import Template
+
+_lock = threading.Lock()
+_stats = {}  # (template name, block name or None) -> [calls, seconds]
+
+def _record(key, elapsed):
+    with _lock:
+        entry = _stats.setdefault(key, [0, 0.0])
+        entry[0] += 1
+        entry[1] += elapsed
+
+def _timed(key, render_func):
+    def timed(context):
+        start = perf_counter()
+        try:
+            yield from render_func(context)
+        finally:
+            _record(key, perf_counter() - start)
+    return timed
+
+class ProfiledTemplate(Template):
+    """A template whose whole render and every block render are timed."""
+
+    @classmethod
+    def _from_namespace(cls, environment, namespace, globals):
+        template = super()._from_namespace(environment, namespace, globals)
+        template.root_render_func = _timed((template.name, None), template.root_render_func)
+        template.blocks = {
+            name: _timed((template.name, name), func)
+            for name, func in template.blocks.items()
+        }
+        return template
+
+def template_profile():
+    """Render totals, slowest first. A block of None is the whole template."""
+    with _lock:
+        items = list(_stats.items())
+    report = [{
+        'template': template,
+        'block': block,
+        'calls': calls,
+        'total_ms': round(seconds * 1000, 2),
+        'avg_ms': round(seconds * 1000 / calls, 2)
+    } for (template, block), (calls, seconds) in items]
+    return sorted(report, key=lambda row: row['total_ms'], reverse=True)
+
+def _render_started(sender, template, context, **extra):
+    g.render_started = perf_counter()
+
+def _render_finished(sender, template, context, **extra):
+    if 'render_started' in g:
+        g.render_time = g.get('render_time', 0.0) + perf_counter() - g.pop('render_started')
+
+def _add_server_timing(response):
+    if 'render_time' in g:
+        response.headers.add('Server-Timing', f"render;dur={g.render_time * 1000:.2f}")
+    return response
+
+def init_template_profiling(app):
+    if not app.config['PROFILE_TEMPLATES']:
+        return
+    # Must happen before the first template is loaded
+    app.jinja_env.template_class = ProfiledTemplate
+    before_render_template.connect(_render_started, app)
+    template_rendered.connect(_render_finished, app)
+    app.after_request(_add_server_timing)
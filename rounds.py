@@ -0,0 +1,71 @@
+"""
+Contest rounds.
+
+There is always exactly one open round: new photos join it and only its
+photos can be voted for. Closing a round copies its final ranking into
+round_results in a single INSERT ... SELECT, and from then on winner pages
+read those rows and never recompute anything. Once a round is archived its
+vote rows are no longer needed and can be compacted away.
+"""
+from datetime import datetime
+from sqlalchemy import func, insert, literal, select
+from sqlalchemy.orm import contains_eager
+from models import db, Photo, Round, RoundResult, User, Vote
+
+def get_open_round():
+    """The round currently taking photos and votes (created if missing)."""
+    current = Round.query.filter_by(status='open').order_by(Round.id.desc()).first()
+    if current is None:
+        current = Round(name=f"Round {Round.query.count() + 1}")
+        db.session.add(current)
+        db.session.commit()
+    return current
+
+def close_round(next_name=None):
+    """Archive the open round's ranking and open the next round. Returns the closed round."""
+    closing = get_open_round()
+
+    ranking = select(
+        literal(closing.id),
+        func.row_number().over(order_by=(Photo.votes_count.desc(), Photo.upload_date, Photo.id)),
+        Photo.id, Photo.title, Photo.description, Photo.filename,
+        Photo.votes_count, Photo.comments_count, Photo.upload_date,
+        User.id, User.username
+    ).join(User, Photo.user_id == User.id)\
+     .where(Photo.round_id == closing.id, Photo.status == 'approved')
+    db.session.execute(insert(RoundResult).from_select([
+        'round_id', 'rank',
+        'photo_id', 'title', 'description', 'filename',
+        'votes_count', 'comments_count', 'upload_date',
+        'author_id', 'author_name'
+    ], ranking))
+
+    closing.status = 'closed'
+    closing.closed_at = datetime.utcnow()
+    next_round = Round(name=next_name or f"Round {Round.query.count() + 1}")
+    db.session.add(next_round)
+    db.session.flush()
+
+    # Photos still waiting for review compete in the next round
+    Photo.query.filter_by(round_id=closing.id, status='pending')\
+               .update({'round_id': next_round.id}, synchronize_session=False)
+
+    db.session.commit()
+    return closing
+
+def get_past_winners(places=3):
+    """Top places of every closed round, newest round first."""
+    return RoundResult.query.join(Round)\
+                            .options(contains_eager(RoundResult.round))\
+                            .filter(RoundResult.rank <= places)\
+                            .order_by(Round.closed_at.desc(), RoundResult.rank)\
+                            .all()
+
+def compact_closed_rounds():
+    """Delete vote rows of archived rounds; their totals live in round_results. Returns the count."""
+    archived_photos = select(Photo.id).join(Round, Photo.round_id == Round.id)\
+                                      .where(Round.status == 'closed')
+    deleted = Vote.query.filter(Vote.photo_id.in_(archived_photos))\
+                        .delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
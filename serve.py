@@ -0,0 +1,107 @@
+"""
+Production launcher for Snap Showdown.
+
+Runs the Flask app under gunicorn (preforking, multi-worker) instead of the
+single-process development server started by `python app.py`:
+
+    python serve.py
+    python serve.py --bind 127.0.0.1:8080 --workers 4 --threads 8
+
+Defaults come from the SERVER_* settings in config.py, which can be
+overridden with environment variables of the same name.
+
+The app is imported once in the master process (preload), caches are warmed,
+and only then are workers forked, so every worker shares the loaded code and
+compiled templates copy-on-write and is ready for traffic immediately.
+
+Reloading without dropping requests:
+    kill -HUP <master pid>    replace workers gracefully (config changes)
+    kill -USR2 <master pid>   start a new master running the new code, then
+                              kill -WINCH / -TERM the old master once the
+                              new one is serving (zero-downtime code deploy)
+"""
+import argparse
+
+from gunicorn.app.base import BaseApplication
+
+from config import Config
+
+
+def warm_caches(app):
+    """Load everything the first request would otherwise pay for."""
+    from models import db, Photo
+
+    with app.app_context():
+        # Compile every template once (filling the bytecode cache) so
+        # workers inherit the compiled code
+        for name in app.jinja_env.list_templates():
+            if name.endswith('.html'):
+                app.jinja_env.get_template(name)
+
+        # Touch the hot tables so SQLite pages are in the OS cache
+        Photo.query.filter_by(status='approved')\
+                   .order_by(Photo.votes_count.desc())\
+                   .limit(20)\
+                   .all()
+
+        # Never hand a live DB connection to forked workers
+        db.session.remove()
+        db.engine.dispose()
+
+
+class SnapShowdownServer(BaseApplication):
+    def __init__(self, options=None):
+        self.options = options or {}
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key.lower(), value)
+
+    def load(self):
+        from app import app
+        warm_caches(app)
+        return app
+
+
+def post_fork(server, worker):
+    # The master never hashes, so each worker starts its own pool while it
+    # still has a single thread
+    from passwords import start_pool
+    start_pool()
+    server.log.info(f"Worker spawned (pid: {worker.pid})")
+
+
+def build_options(args):
+    return {
+        'bind': args.bind,
+        'workers': args.workers,
+        'threads': args.threads,
+        'worker_class': 'gthread' if args.threads > 1 else 'sync',
+        'timeout': Config.SERVER_TIMEOUT,
+        'graceful_timeout': Config.SERVER_GRACEFUL_TIMEOUT,
+        'max_requests': Config.SERVER_MAX_REQUESTS,
+        'max_requests_jitter': Config.SERVER_MAX_REQUESTS // 10,
+        'preload_app': True,
+        'post_fork': post_fork,
+        'accesslog': '-' if args.access_log else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run Snap Showdown with gunicorn.')
+    parser.add_argument('--bind', default=Config.SERVER_BIND)
+    parser.add_argument('--workers', type=int, default=Config.SERVER_WORKERS)
+    parser.add_argument('--threads', type=int, default=Config.SERVER_THREADS)
+    parser.add_argument('--access-log', action='store_true', help='Log every request to stdout')
+    args = parser.parse_args(argv)
+
+    # Limits derived from these (e.g. password hashing slots) must match the real server
+    Config.SERVER_WORKERS = args.workers
+    Config.SERVER_THREADS = args.threads
+    SnapShowdownServer(build_options(args)).run()
+
+
+if __name__ == '__main__':
+    main()
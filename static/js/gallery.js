@@ -0,0 +1,338 @@
+// gallery.js - Voting, commenting, search and sort on the gallery page
+
+// ===== VOTING FUNCTION =====
+async function voteForPhoto(photoId, buttonElement) {
+    console.log('=== VOTING FOR PHOTO:', photoId, '===');
+    
+    if (!buttonElement) {
+        console.error('No button element provided');
+        showNotification('Error: Cannot find vote button', 'error');
+        return;
+    }
+    
+    // Check if already voted
+    if (buttonElement.classList.contains('voted') || buttonElement.disabled) {
+        console.log('Already voted for this photo');
+        showNotification('You have already voted for this photo!', 'info');
+        return;
+    }
+    
+    // Get CSRF token
+    const csrfToken = await ensureCSRFToken();
+    if (!csrfToken) {
+        console.error('CSRF token not found');
+        showNotification('Security error. Please refresh the page.', 'error');
+        return;
+    }
+    
+    console.log('Sending vote request with CSRF token...');
+    
+    // Disable button immediately to prevent double clicks
+    buttonElement.disabled = true;
+    const originalText = buttonElement.innerHTML;
+    buttonElement.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Voting...';
+    
+    // Retry once if the connection drops; the shared key stops a double vote
+    const idempotencyKey = newIdempotencyKey();
+    const sendVote = () => fetch(`/vote/${photoId}`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': csrfToken,
+            'Idempotency-Key': idempotencyKey
+        },
+        credentials: 'same-origin'
+    });
+    
+    try {
+        const response = await sendVote().catch(sendVote);
+        
+        console.log('Response status:', response.status);
+        const data = await response.json();
+        console.log('Response data:', data);
+        
+        if (response.ok && data.success) {
+            // Update vote count
+            const voteCountElement = document.getElementById(`votes-${photoId}`);
+            if (voteCountElement) {
+                voteCountElement.textContent = data.votes;
+            }
+            
+            // Update button state
+            buttonElement.classList.add('voted');
+            buttonElement.innerHTML = '<i class="fas fa-heart"></i> Voted';
+            
+            // Update data attribute for sorting
+            const photoCard = buttonElement.closest('.photo-card');
+            if (photoCard) {
+                photoCard.setAttribute('data-votes', data.votes);
+            }
+            
+            // Update all vote buttons for this photo
+            document.querySelectorAll(`[data-photo-id="${photoId}"].btn-vote`).forEach(btn => {
+                btn.classList.add('voted');
+                btn.disabled = true;
+                btn.innerHTML = '<i class="fas fa-heart"></i> Voted';
+            });
+            
+            showNotification(data.message || 'Vote counted successfully!', 'success');
+            
+        } else {
+            const errorMessage = data.error || 'Failed to vote. Please try again.';
+            console.error('Vote error:', errorMessage);
+            showNotification(errorMessage, 'error');
+            
+            // Re-enable button if error
+            buttonElement.disabled = false;
+            buttonElement.innerHTML = originalText;
+            
+            // If error is "already voted", update button state
+            if (data.error && data.error.includes('already voted')) {
+                buttonElement.classList.add('voted');
+                buttonElement.disabled = true;
+                buttonElement.innerHTML = '<i class="fas fa-heart"></i> Voted';
+            }
+        }
+    } catch (error) {
+        console.error('Network error:', error);
+        showNotification('Network error. Please try again.', 'error');
+        
+        // Re-enable button on error
+        buttonElement.disabled = false;
+        buttonElement.innerHTML = originalText;
+    }
+}
+
+// ===== COMMENT FUNCTION =====
+async function submitComment(photoId, textareaElement = null) {
+    console.log('=== SUBMITTING COMMENT FOR PHOTO:', photoId, '===');
+    
+    let commentText = '';
+    let textarea = textareaElement;
+    
+    if (!textarea) {
+        textarea = document.getElementById(`comment-text-${photoId}`);
+    }
+    
+    if (!textarea) {
+        console.error('Comment textarea not found');
+        showNotification('Error: Cannot find comment field', 'error');
+        return;
+    }
+    
+    commentText = textarea.value.trim();
+    
+    if (!commentText) {
+        showNotification('Please enter a comment.', 'error');
+        textarea.focus();
+        return;
+    }
+    
+    // Get CSRF token
+    const csrfToken = await ensureCSRFToken();
+    if (!csrfToken) {
+        console.error('CSRF token not found');
+        showNotification('Security error. Please refresh the page.', 'error');
+        return;
+    }
+    
+    console.log('Sending comment request...');
+    
+    try {
+        const formData = new URLSearchParams();
+        formData.append('content', commentText);
+        
+        const response = await fetch(`/comment/${photoId}`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/x-www-form-urlencoded',
+                'X-CSRFToken': csrfToken
+            },
+            body: formData,
+            credentials: 'same-origin'
+        });
+        
+        console.log('Response status:', response.status);
+        const data = await response.json();
+        console.log('Response data:', data);
+        
+        if (response.ok && data.success) {
+            // Clear textarea
+            textarea.value = '';
+            
+            // Add new comment to UI
+            const commentsList = document.getElementById(`comments-${photoId}`);
+            if (commentsList) {
+                const newComment = document.createElement('div');
+                newComment.className = 'comment';
+                newComment.innerHTML = `
+                    <strong>${data.username || document.getElementById('photoGrid').dataset.username}:</strong>
+                    ${data.content || commentText}
+                `;
+                
+                // Add to top of comments list
+                if (commentsList.firstChild) {
+                    commentsList.insertBefore(newComment, commentsList.firstChild);
+                } else {
+                    commentsList.appendChild(newComment);
+                }
+                
+                // Update comment count
+                const commentHeader = commentsList.previousElementSibling;
+                if (commentHeader && commentHeader.tagName === 'H4') {
+                    const countMatch = commentHeader.textContent.match(/\((\d+)\)/);
+                    if (countMatch) {
+                        const newCount = parseInt(countMatch[1]) + 1;
+                        commentHeader.textContent = commentHeader.textContent.replace(
+                            /\(\d+\)/,
+                            `(${newCount})`
+                        );
+                    } else {
+                        commentHeader.textContent = `Comments (1)`;
+                    }
+                }
+            }
+            
+            showNotification(data.message || 'Comment added successfully!', 'success');
+            
+        } else {
+            const errorMessage = data.error || 'Failed to add comment.';
+            console.error('Comment error:', errorMessage);
+            showNotification(errorMessage, 'error');
+        }
+    } catch (error) {
+        console.error('Network error:', error);
+        showNotification('Network error. Please try again.', 'error');
+    }
+}
+
+// ===== OTHER FUNCTIONS =====
+function viewPhotoDetails(photoId) {
+    console.log('Viewing photo details:', photoId);
+    window.location.href = `/photo/${photoId}`;
+}
+
+// ===== SEARCH AND FILTER FUNCTIONS =====
+document.getElementById('searchInput').addEventListener('input', function() {
+    const searchTerm = this.value.toLowerCase();
+    const photoCards = document.querySelectorAll('.photo-card');
+    
+    photoCards.forEach(card => {
+        const title = card.querySelector('h3').textContent.toLowerCase();
+        const description = card.querySelector('.photo-description').textContent.toLowerCase();
+        const author = card.querySelector('.author').textContent.toLowerCase();
+        
+        if (title.includes(searchTerm) || description.includes(searchTerm) || author.includes(searchTerm)) {
+            card.style.display = 'block';
+        } else {
+            card.style.display = 'none';
+        }
+    });
+});
+
+document.getElementById('sortSelect').addEventListener('change', function() {
+    const sortBy = this.value;
+    const container = document.getElementById('photoGrid');
+    const photoCards = Array.from(container.querySelectorAll('.photo-card'));
+    
+    photoCards.sort((a, b) => {
+        if (sortBy === 'votes') {
+            const votesA = parseInt(a.getAttribute('data-votes'));
+            const votesB = parseInt(b.getAttribute('data-votes'));
+            return votesB - votesA;
+        } else if (sortBy === 'recent') {
+            const dateA = new Date(a.getAttribute('data-date'));
+            const dateB = new Date(b.getAttribute('data-date'));
+            return dateB - dateA;
+        } else if (sortBy === 'oldest') {
+            const dateA = new Date(a.getAttribute('data-date'));
+            const dateB = new Date(b.getAttribute('data-date'));
+            return dateA - dateB;
+        }
+        return 0;
+    });
+    
+    // Re-append sorted cards
+    photoCards.forEach(card => container.appendChild(card));
+});
+
+// ===== INITIALIZATION =====
+document.addEventListener('DOMContentLoaded', function() {
+    console.log('=== GALLERY PAGE INITIALIZED ===');
+    
+    // Initialize vote buttons
+    document.querySelectorAll('.btn-vote:not(.voted)').forEach(button => {
+        button.addEventListener('click', function(e) {
+            e.preventDefault();
+            e.stopPropagation();
+            const photoId = this.getAttribute('data-photo-id');
+            console.log('Vote button clicked for photo:', photoId);
+            voteForPhoto(photoId, this);
+        });
+    });
+    
+    // Fix for double comment submission
+    // We'll handle comment submission ONLY through the onclick attribute
+    // Remove any duplicate event listeners that might have been added
+    document.querySelectorAll('.btn-small').forEach(button => {
+        const onclickAttr = button.getAttribute('onclick');
+        if (onclickAttr && onclickAttr.includes('submitComment')) {
+            // Keep the onclick attribute, but ensure it only fires once
+            button.setAttribute('data-clicked', 'false');
+            
+            // Store original onclick
+            const originalOnclick = onclickAttr;
+            
+            // Replace with our controlled version
+            button.onclick = function(e) {
+                e.preventDefault();
+                e.stopPropagation();
+                
+                // Prevent double clicks
+                if (this.getAttribute('data-clicked') === 'true') {
+                    console.log('Button already clicked, ignoring');
+                    return false;
+                }
+                
+                this.setAttribute('data-clicked', 'true');
+                
+                // Extract photo ID
+                const match = originalOnclick.match(/submitComment\('(\d+)'\)/);
+                if (match) {
+                    const photoId = match[1];
+                    const textarea = document.getElementById(`comment-text-${photoId}`);
+                    if (textarea) {
+                        console.log('Submitting comment for photo:', photoId);
+                        submitComment(photoId, textarea);
+                    }
+                }
+                
+                // Re-enable button after 2 seconds
+                setTimeout(() => {
+                    this.setAttribute('data-clicked', 'false');
+                }, 2000);
+                
+                return false;
+            };
+        }
+    });
+    
+    // Initialize Enter key for comment submission (Ctrl+Enter)
+    document.querySelectorAll('textarea[id^="comment-text-"]').forEach(textarea => {
+        textarea.addEventListener('keypress', function(e) {
+            if (e.key === 'Enter' && e.ctrlKey) {
+                e.preventDefault();
+                const photoId = this.id.replace('comment-text-', '');
+                submitComment(photoId, this);
+            }
+        });
+    });
+    
+    // Test CSRF token on load
+    ensureCSRFToken().then(token => {
+        console.log('CSRF token on load:', token ? 'Available' : 'Missing');
+    });
+    
+    console.log('Vote buttons:', document.querySelectorAll('.btn-vote').length);
+    console.log('Comment areas:', document.querySelectorAll('textarea[id^="comment-text-"]').length);
+});
@@ -0,0 +1,90 @@
+// leaderboard.js - Search, live refresh and voting on the leaderboard page
+
+// Search functionality for leaderboard
+document.getElementById('searchLeaderboard').addEventListener('input', function() {
+    const searchTerm = this.value.toLowerCase();
+    const rows = document.querySelectorAll('.leaderboard-table tbody tr');
+    
+    rows.forEach(row => {
+        const title = row.querySelector('.title-cell strong')?.textContent.toLowerCase() || '';
+        const user = row.querySelector('.user-details strong')?.textContent.toLowerCase() || '';
+        const description = row.querySelector('.photo-description')?.textContent.toLowerCase() || '';
+        
+        if (title.includes(searchTerm) || user.includes(searchTerm) || description.includes(searchTerm)) {
+            row.style.display = '';
+        } else {
+            row.style.display = 'none';
+        }
+    });
+});
+
+// Time filter functionality
+document.getElementById('timeFilter').addEventListener('change', function() {
+    const filter = this.value;
+    // In a real implementation, this would make an API call to filter by date
+    alert('Time filter selected: ' + filter + '\nThis would filter photos by date in a real implementation.');
+});
+
+// Set progress bar widths after page loads
+document.addEventListener('DOMContentLoaded', function() {
+    const progressFills = document.querySelectorAll('.progress-fill');
+    progressFills.forEach(fill => {
+        const percentage = fill.getAttribute('data-percentage') || '0';
+        fill.style.width = percentage + '%';
+    });
+});
+
+// Auto-refresh leaderboard every 30 seconds
+setInterval(() => {
+    fetch('/api/leaderboard-data')
+        .then(response => response.json())
+        .then(data => {
+            if (data.updated) {
+                // Update vote counts dynamically
+                data.photos.forEach(photo => {
+                    const voteElement = document.querySelector(`.votes-count[data-photo-id="${photo.id}"]`);
+                    if (voteElement) {
+                        voteElement.innerHTML = `<i class="fas fa-heart" style="color: #e74c3c;"></i> ${photo.votes_count}`;
+                    }
+                });
+            }
+        })
+        .catch(error => console.error('Failed to update leaderboard:', error));
+}, 30000);
+
+// Vote function
+function voteForPhoto(photoId) {
+    fetch(`/vote/${photoId}`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': getCSRFToken(),
+            'Idempotency-Key': newIdempotencyKey()
+        }
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.error) {
+            alert(data.error);
+        } else {
+            alert(data.success);
+            // Find and update the vote button and count
+            const voteButton = document.querySelector(`.btn-vote-small[onclick="voteForPhoto(${photoId})"]`);
+            if (voteButton) {
+                voteButton.disabled = true;
+                voteButton.classList.add('voted');
+                voteButton.innerHTML = '<i class="fas fa-heart"></i> Voted';
+            }
+            
+            // Update vote count
+            const voteCountElement = document.querySelector(`.votes-count[data-photo-id="${photoId}"]`);
+            if (voteCountElement) {
+                voteCountElement.innerHTML = `<i class="fas fa-heart" style="color: #e74c3c;"></i> ${data.votes}`;
+            }
+        }
+    })
+    .catch(error => {
+        console.error('Error voting:', error);
+        alert('An error occurred while voting. Please try again.');
+    });
+}
@@ -12,55 +12,15 @@ function formatDate(dateString) {
     });
 }
 
-// CSRF token utility (if not in gallery.html)
-async function ensureCSRFToken() {
-    function getCSRFToken() {
-        const tokenSelectors = [
-            'meta[name="csrf-token"]',
-            'input[name="csrf_token"]',
-            'input[name="csrf-token"]'
-        ];
-        
-        for (const selector of tokenSelectors) {
-            const element = document.querySelector(selector);
-            if (element) {
-                const token = element.getAttribute('content') || element.value;
-                if (token && token !== 'None' && token !== '') {
-                    return token;
-                }
-            }
-        }
-        return null;
-    }
-    
-    async function fetchCSRFToken() {
-        try {
-            const response = await fetch('/api/test-csrf');
-            const data = await response.json();
-            if (data.csrf_token) {
-                let metaTag = document.querySelector('meta[name="csrf-token"]');
-                if (!metaTag) {
-                    metaTag = document.createElement('meta');
-                    metaTag.name = 'csrf-token';
-                    document.head.appendChild(metaTag);
-                }
-                metaTag.setAttribute('content', data.csrf_token);
-                return data.csrf_token;
-            }
-        } catch (error) {
-            console.error('Failed to fetch CSRF token:', error);
-        }
-        return null;
-    }
-    
-    let token = getCSRFToken();
-    if (!token) {
-        token = await fetchCSRFToken();
+// Idempotency-Key for a write request; reuse it when retrying the same request
+function newIdempotencyKey() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
     }
-    return token;
+    return Date.now().toString(36) + Math.random().toString(36).slice(2);
 }
 
-// Notification utility (if not in gallery.html)
+// Notification utility
 function showNotification(message, type = 'info') {
     // Remove existing notifications
     document.querySelectorAll('.custom-notification').forEach(n => n.remove());
@@ -74,7 +34,7 @@ function showNotification(message, type = 'info') {
         top: 20px;
         right: 20px;
         padding: 15px 20px;
-        background: ${type === 'success' ? '#4CAF50' : type === 'error' ? '#F44336' : '#2196F3'};
+        background: ${type === 'success' ? '#4CAF50' : type === 'error' ? '#F44336' : type === 'warning' ? '#FF9800' : '#2196F3'};
         color: white;
         border-radius: 5px;
         box-shadow: 0 2px 10px rgba(0,0,0,0.2);
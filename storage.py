@@ -0,0 +1,127 @@
+"""
+Where uploaded files live.
+
+LocalStorage keeps them in UPLOAD_FOLDER, which only works for a single app
+node. S3Storage keeps them in a bucket on any S3-compatible service so several
+nodes can share them. For local testing point it at MinIO:
+
+    docker run -p 9000:9000 minio/minio server /data
+    STORAGE_BACKEND=s3 S3_ENDPOINT_URL=http://localhost:9000 \
+        S3_ACCESS_KEY=minioadmin S3_SECRET_KEY=minioadmin python app.py
+
+Keys are paths relative to the upload root, e.g. "photo.jpg" or
+"profile_pictures/profile_2_2ebba115.png".
+"""
+import mimetypes
+import os
+import shutil
+import boto3
+from botocore.exceptions import ClientError
+from flask import redirect, send_from_directory
+from werkzeug.security import safe_join
+from config import Config
+
+class LocalStorage:
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, key):
+        path = safe_join(self.root, key)
+        if path is None:
+            raise FileNotFoundError(key)
+        return path
+
+    def save(self, fileobj, key):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as out:
+            shutil.copyfileobj(fileobj, out)
+
+    def open(self, key):
+        return open(self._path(key), 'rb')
+
+    def exists(self, key):
+        return os.path.isfile(self._path(key))
+
+    def keys(self):
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                path = os.path.relpath(os.path.join(dirpath, name), self.root)
+                yield path.replace(os.sep, '/')
+
+    def send(self, key):
+        return send_from_directory(self.root, key)
+
+class S3Storage:
+    def __init__(self, bucket, endpoint_url=None, access_key=None, secret_key=None,
+                 region=None, url_expires=3600):
+        self.bucket = bucket
+        self.url_expires = url_expires
+        self.client = boto3.client(
+            's3',
+            endpoint_url=endpoint_url,
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+            region_name=region
+        )
+
+    def save(self, fileobj, key):
+        # upload_fileobj reads the file in chunks (multipart for big files),
+        # so an upload is never held in memory as a whole
+        content_type = mimetypes.guess_type(key)[0] or 'application/octet-stream'
+        self.client.upload_fileobj(fileobj, self.bucket, key,
+                                   ExtraArgs={'ContentType': content_type})
+
+    def open(self, key):
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=key)['Body']
+        except ClientError:
+            raise FileNotFoundError(key)
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError:
+            return False
+
+    def keys(self):
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket):
+            for obj in page.get('Contents', []):
+                yield obj['Key']
+
+    def send(self, key):
+        # Send the browser straight to the bucket; the app never proxies image bytes
+        url = self.client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket, 'Key': key},
+            ExpiresIn=self.url_expires
+        )
+        response = redirect(url)
+        response.cache_control.private = True
+        response.cache_control.max_age = self.url_expires // 2
+        return response
+
+def create_storage(backend):
+    if backend == 'local':
+        return LocalStorage(Config.UPLOAD_FOLDER)
+    if backend == 's3':
+        return S3Storage(
+            Config.S3_BUCKET,
+            endpoint_url=Config.S3_ENDPOINT_URL,
+            access_key=Config.S3_ACCESS_KEY,
+            secret_key=Config.S3_SECRET_KEY,
+            region=Config.S3_REGION,
+            url_expires=Config.S3_URL_EXPIRES
+        )
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+_storage = None
+
+def get_storage():
+    """The storage backend selected by STORAGE_BACKEND, created on first use."""
+    global _storage
+    if _storage is None:
+        _storage = create_storage(Config.STORAGE_BACKEND)
+    return _storage
@@ -0,0 +1,107 @@
+"""
+S3Storage and migrate-uploads against moto's in-memory S3.
+
+    pip install -r requirements-dev.txt
+    python -m pytest tests
+"""
+import io
+import os
+import sys
+
+import boto3
+import pytest
+import requests
+from flask import Flask
+from moto import mock_aws
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage
+from commands import register_commands
+from config import Config
+from storage import S3Storage
+
+BUCKET = 'snapshowdown-test'
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        boto3.client('s3', region_name='us-east-1').create_bucket(Bucket=BUCKET)
+        yield S3Storage(BUCKET, access_key='testing', secret_key='testing',
+                        region='us-east-1', url_expires=600)
+
+def test_save_open_exists(s3):
+    s3.save(io.BytesIO(b'jpeg bytes'), 'photo.jpg')
+
+    assert s3.exists('photo.jpg')
+    assert not s3.exists('missing.jpg')
+    with s3.open('photo.jpg') as f:
+        assert f.read() == b'jpeg bytes'
+    head = s3.client.head_object(Bucket=BUCKET, Key='photo.jpg')
+    assert head['ContentType'] == 'image/jpeg'
+
+def test_open_missing_raises_file_not_found(s3):
+    with pytest.raises(FileNotFoundError):
+        s3.open('missing.jpg')
+
+def test_keys_lists_nested_keys(s3):
+    for key in ['a.png', 'profile_pictures/profile_2_abc.png']:
+        s3.save(io.BytesIO(b'x'), key)
+
+    assert sorted(s3.keys()) == ['a.png', 'profile_pictures/profile_2_abc.png']
+
+def test_send_redirects_to_presigned_url(s3):
+    s3.save(io.BytesIO(b'jpeg bytes'), 'photo.jpg')
+
+    with Flask(__name__).test_request_context():
+        response = s3.send('photo.jpg')
+
+    assert response.status_code == 302
+    url = response.headers['Location']
+    assert 'Signature=' in url
+    assert requests.get(url).content == b'jpeg bytes'
+    assert response.cache_control.private
+    assert response.cache_control.max_age == 300
+
+@pytest.fixture
+def cli(s3, tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setattr(storage, '_storage', s3)
+    app = Flask(__name__)
+    register_commands(app)
+    return app.test_cli_runner()
+
+def test_migrate_uploads_copies_missing_files(cli, s3, tmp_path):
+    (tmp_path / 'photo.jpg').write_bytes(b'new photo')
+    (tmp_path / 'profile_pictures').mkdir()
+    (tmp_path / 'profile_pictures' / 'profile_2_abc.png').write_bytes(b'avatar')
+    s3.save(io.BytesIO(b'already there'), 'photo.jpg')
+
+    result = cli.invoke(args=['migrate-uploads'])
+
+    assert result.exit_code == 0, result.output
+    assert 'Done: 1 copied, 1 already present.' in result.output
+    with s3.open('profile_pictures/profile_2_abc.png') as f:
+        assert f.read() == b'avatar'
+    with s3.open('photo.jpg') as f:
+        assert f.read() == b'already there'
+
+def test_migrate_uploads_overwrite(cli, s3, tmp_path):
+    (tmp_path / 'photo.jpg').write_bytes(b'new photo')
+    s3.save(io.BytesIO(b'already there'), 'photo.jpg')
+
+    result = cli.invoke(args=['migrate-uploads', '--overwrite'])
+
+    assert result.exit_code == 0, result.output
+    with s3.open('photo.jpg') as f:
+        assert f.read() == b'new photo'
+
+def test_migrate_uploads_refuses_local_target(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, '_storage', storage.LocalStorage(str(tmp_path)))
+    app = Flask(__name__)
+    register_commands(app)
+
+    result = app.test_cli_runner().invoke(args=['migrate-uploads'])
+
+    assert result.exit_code != 0
+    assert 'STORAGE_BACKEND is local' in result.output
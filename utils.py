@@ -1,7 +1,19 @@
+import io
 import os
+import base64
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, g
+from flask_login import current_user
+from markupsafe import Markup
 from werkzeug.utils import secure_filename
 from PIL import Image
 from config import Config
+from storage import get_storage
+
+# Background threads for follow-up work the client shouldn't wait for
+_background = ThreadPoolExecutor(max_workers=Config.NOTIFICATION_WORKERS,
+                                 thread_name_prefix='notify')
 
 def allowed_file(filename):
     return '.' in filename and \
@@ -15,19 +27,23 @@ def save_photo(file):
         import uuid
         unique_filename = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}_{filename}"
         
-        # Save file
-        filepath = os.path.join(Config.UPLOAD_FOLDER, unique_filename)
-        file.save(filepath)
-        
-        # Optimize image if needed
-        optimize_image(filepath)
+        # Optimize image and hand the result to the storage backend
+        optimized, metadata = optimize_image(file.stream)
+        get_storage().save(optimized, unique_filename)
         
-        return unique_filename
-    return None
+        return unique_filename, metadata
+    return None, None
 
-def optimize_image(filepath, max_size=(1200, 1200)):
+def optimize_image(stream, max_size=(1200, 1200)):
+    """
+    Return a file object with the resized JPEG and its image_metadata(), or the
+    original stream and None if it can't be processed.
+    """
     try:
-        img = Image.open(filepath)
+        img = Image.open(stream)
+        # Palette images (GIFs, many PNGs) can't be resized smoothly or saved as JPEG
+        if img.mode in ('P', 'PA'):
+            img = img.convert('RGBA' if img.mode == 'PA' or 'transparency' in img.info else 'RGB')
         img.thumbnail(max_size, Image.Resampling.LANCZOS)
         
         # Convert to RGB if necessary
@@ -35,13 +51,142 @@ def optimize_image(filepath, max_size=(1200, 1200)):
             background = Image.new('RGB', img.size, (255, 255, 255))
             background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else img)
             img = background
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
         
-        img.save(filepath, 'JPEG', quality=85)
+        output = io.BytesIO()
+        img.save(output, 'JPEG', quality=85)
+        output.seek(0)
+        return output, image_metadata(img, output.getbuffer().nbytes, 'JPEG')
     except Exception as e:
         print(f"Error optimizing image: {e}")
+        stream.seek(0)
+        return stream, None
+
+def image_metadata(img, file_size, image_format):
+    """Photo column values for an already decoded image."""
+    tiny = img.copy()
+    tiny.thumbnail(Config.PLACEHOLDER_SIZE)
+    tiny = tiny.convert('RGB')
+    
+    # Most common of a few quantized colours is the dominant one
+    quantized = tiny.quantize(colors=4)
+    _, index = max(quantized.getcolors())
+    red, green, blue = quantized.getpalette()[index * 3:index * 3 + 3]
+    
+    preview = io.BytesIO()
+    tiny.save(preview, 'JPEG', quality=60)
+    return {
+        'width': img.width,
+        'height': img.height,
+        'file_size': file_size,
+        'image_format': image_format,
+        'dominant_color': f"#{red:02x}{green:02x}{blue:02x}",
+        'placeholder': 'data:image/jpeg;base64,' + base64.b64encode(preview.getvalue()).decode('ascii')
+    }
+
+def photo_img_attrs(photo):
+    """Size and placeholder attributes for a photo's <img>, so the layout is stable while it loads."""
+    if not photo.width:
+        return ''
+    return Markup('width="{}" height="{}" style="background: {} url({}) center / cover no-repeat"')\
+        .format(photo.width, photo.height, photo.dominant_color, photo.placeholder)
 
 def create_notification(user_id, message):
     from models import Notification, db
     notification = Notification(user_id=user_id, message=message)
     db.session.add(notification)
-    db.session.commit()
\ No newline at end of file
+    db.session.commit()
+
+def visible_comments_query():
+    """Comments that aren't removed, with their author's name in the same row."""
+    from models import Comment, User, db
+    return db.session.query(Comment.id, Comment.photo_id, Comment.content,
+                            Comment.created_at, User.username.label('author'))\
+                     .join(User, Comment.user_id == User.id)\
+                     .filter(Comment.status != 'removed')
+
+def encode_comment_cursor(comment):
+    return f"{comment.created_at.isoformat()}_{comment.id}"
+
+def decode_comment_cursor(cursor):
+    created_at, comment_id = cursor.rsplit('_', 1)
+    return datetime.fromisoformat(created_at), int(comment_id)
+
+def get_comment_page(photo_id, cursor=None, limit=20):
+    """A page of a photo's comments, newest first, and the cursor for the next one.
+    
+    Paging is keyset-based on (created_at, id) so deep pages cost the same as
+    the first. Raises ValueError for a malformed cursor.
+    """
+    from models import Comment
+    from sqlalchemy import and_, or_
+    query = visible_comments_query().filter(Comment.photo_id == photo_id)
+    if cursor:
+        created_at, comment_id = decode_comment_cursor(cursor)
+        query = query.filter(or_(
+            Comment.created_at < created_at,
+            and_(Comment.created_at == created_at, Comment.id < comment_id)
+        ))
+    comments = query.order_by(Comment.created_at.desc(), Comment.id.desc())\
+                    .limit(limit + 1)\
+                    .all()
+    next_cursor = encode_comment_cursor(comments[limit - 1]) if len(comments) > limit else None
+    return comments[:limit], next_cursor
+
+def comment_to_dict(comment):
+    return {
+        'id': comment.id,
+        'author': comment.author,
+        'content': comment.content,
+        'time': comment.created_at.strftime('%Y-%m-%d %H:%M')
+    }
+
+def get_comment_previews(photo_ids, per_photo=3):
+    """The newest few comments of each photo, fetched in a single query."""
+    from models import Comment, db
+    from sqlalchemy import func
+    if not photo_ids:
+        return {}
+    ranked = visible_comments_query()\
+        .add_columns(func.row_number().over(
+            partition_by=Comment.photo_id,
+            order_by=(Comment.created_at.desc(), Comment.id.desc())
+        ).label('position'))\
+        .filter(Comment.photo_id.in_(photo_ids))\
+        .subquery()
+    rows = db.session.query(ranked)\
+                       .filter(ranked.c.position <= per_photo)\
+                       .order_by(ranked.c.photo_id, ranked.c.position)\
+                       .all()
+    previews = {photo_id: [] for photo_id in photo_ids}
+    for row in rows:
+        previews[row.photo_id].append(row)
+    return previews
+
+def get_voted_photo_ids():
+    """IDs of the photos the current user has voted for, loaded once per request."""
+    from models import Vote, db
+    if not current_user.is_authenticated:
+        return frozenset()
+    if 'voted_photo_ids' not in g:
+        rows = db.session.query(Vote.photo_id).filter_by(user_id=current_user.id)
+        g.voted_photo_ids = frozenset(photo_id for (photo_id,) in rows)
+    return g.voted_photo_ids
+
+def forget_voted_photo_ids():
+    """Drop the cached vote set after the current user votes."""
+    g.pop('voted_photo_ids', None)
+
+def notify_later(user_id, message):
+    """Create a notification in the background instead of in the request."""
+    app = current_app._get_current_object()
+    
+    def task():
+        with app.app_context():
+            try:
+                create_notification(user_id, message)
+            except Exception as e:
+                print(f"Failed to create notification: {e}")
+    
+    _background.submit(task)